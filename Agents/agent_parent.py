@@ -18,6 +18,7 @@ import os
 import sys
 from os.path import abspath, dirname
 
+import numpy as np
 import pandas as pd
 
 ROOT_PATH = dirname(dirname(abspath(__file__)))
@@ -76,6 +77,56 @@ class Agent_Parent:
                 return True
         return False
 
+    def new_preds(self, pred_df, agent_df):  # Top Level
+        """
+        anti-join of the predictions against the agent's bets on (Date, Home, Away, Bet_Type),
+        leaving only predictions the agent hasn't bet on yet
+        """
+        key_cols = ['Date', 'Home', 'Away', 'Bet_Type']
+        merged = pred_df[key_cols].merge(agent_df[key_cols].drop_duplicates(), how='left', on=key_cols, indicator=True)
+        return pred_df[(merged['_merge'] == 'left_only').to_numpy()]
+
+    def _bets(self, pred_df):  # Specific Helper new_bet_df
+        """
+        vectorized _get_bet
+        """
+        predicted_home = pred_df['Prediction'].to_numpy(dtype=float) > 0.5
+        return np.where(pred_df['Bet_Type'].to_numpy(dtype=object) == "Total", np.where(predicted_home, "Over", "Under"),
+                        np.where(predicted_home, pred_df['Home'].to_numpy(dtype=object), pred_df['Away'].to_numpy(dtype=object)))
+
+    def _to_win_amounts(self, bet_mls, wagers):  # Specific Helper new_bet_df
+        """
+        vectorized _to_win_amount
+        """
+        to_win = np.where(bet_mls > 0, wagers * (bet_mls / 100), wagers / (np.abs(bet_mls) / 100))
+        return [round(amount, 2) for amount in to_win.tolist()]
+
+    def new_bet_df(self, pred_df):  # Top Level
+        """
+        making the agent's bets for every prediction in pred_df at once
+        - agents define _wagers(pred_df), the amount bet on each prediction
+        """
+        wagers = self._wagers(pred_df)
+        bet_mls = pred_df['Bet_ML'].to_numpy(dtype=float)
+        return pd.DataFrame({"League": self.league, "Date": pred_df['Date'].to_numpy(), "Home": pred_df['Home'].to_numpy(),
+                             "Away": pred_df['Away'].to_numpy(), "Bet_Type": pred_df['Bet_Type'].to_numpy(),
+                             "Bet": self._bets(pred_df), "Prediction": pred_df['Prediction'].to_numpy(),
+                             "Bet_Value": pred_df['Bet_Value'].to_numpy(), "Bet_ML": pred_df['Bet_ML'].to_numpy(),
+                             "Wager": wagers, "To_Win": self._to_win_amounts(bet_mls, wagers), "Outcome": None, "Profit": None,
+                             "Bet_ts": self._current_ts()})
+
+    def place_bets(self):  # Run
+        """
+        betting on every new prediction in /Data/Predictions/ and appending the bets to the agent's csv
+        """
+        pred_df = pd.read_csv(ROOT_PATH + f"/Data/Predictions/{self.league}/Predictions.csv")
+        agent_df = self.make_load_agent_df()
+        new_pred_df = self.new_preds(pred_df, agent_df)
+        if len(new_pred_df) > 0:
+            bet_df = self.new_bet_df(new_pred_df)
+            agent_df = bet_df if agent_df.empty else pd.concat([agent_df, bet_df], ignore_index=True)
+        agent_df.to_csv(ROOT_PATH + f"/Data/Agents/{self.league}/{self.agent_type}.csv", index=False)
+
 
 if __name__ == '__main__':
     x = Agent_Parent()
@@ -38,6 +38,12 @@ class Dynamic(Agent_Parent):
         extra_confidence = abs(confidence - 0.5) * 20
         return min_amount + extra_confidence
 
+    def _wagers(self, pred_df):  # Specific Helper new_bet_df
+        """
+        vectorized _dynamic_wager
+        """
+        return self._dynamic_wager(pred_df['Prediction'].to_numpy(dtype=float))
+
     def dynamic_bet(self, agent_df, pred):  # Top Level
         """
         make a dynamic bet and add it to the agent_df
@@ -56,7 +62,11 @@ class Dynamic(Agent_Parent):
         agent_df.loc[len(agent_df)] = new_bet
         return agent_df
 
-    def run(self):
+    def run(self, batched=True):  # Run
+        if batched:
+            self.place_bets()
+            return
+
         pred_df = pd.read_csv(ROOT_PATH + f"/Data/Predictions/{self.league}/Predictions.csv")
         agent_df = self.make_load_agent_df()
         preds = pred_df.to_dict('records')
@@ -16,6 +16,7 @@
 import sys
 from os.path import abspath, dirname
 
+import numpy as np
 import pandas as pd
 
 ROOT_PATH = dirname(dirname(abspath(__file__)))
@@ -31,6 +32,12 @@ class Flat(Agent_Parent):
         self.league = league
         self.agent_type = "Flat"
 
+    def _wagers(self, pred_df):  # Specific Helper new_bet_df
+        """
+        flat $10 wager on every prediction
+        """
+        return np.full(len(pred_df), 10)
+
     def flat_bet(self, agent_df, pred):  # Top Level
         """
         make a flat $10 bet and add to the agent_df
@@ -48,7 +55,11 @@ class Flat(Agent_Parent):
         agent_df.loc[len(agent_df)] = new_bet
         return agent_df
 
-    def run(self):  # Run
+    def run(self, batched=True):  # Run
+        if batched:
+            self.place_bets()
+            return
+
         pred_df = pd.read_csv(ROOT_PATH + f"/Data/Predictions/{self.league}/Predictions.csv")
         agent_df = self.make_load_agent_df()
         preds = pred_df.to_dict('records')
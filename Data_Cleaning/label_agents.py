@@ -17,6 +17,7 @@
 import sys
 from os.path import abspath, dirname
 
+import numpy as np
 import pandas as pd
 from tqdm import tqdm
 
@@ -45,9 +46,30 @@ class Label_Agents(Label_Predictions):
         else:
             return -wager
 
-    def run_one(self, agent):  # Run
-        agent_df = pd.read_csv(ROOT_PATH + f"/Data/Agents/{self.league}/{agent}.csv")
-        espn_df = pd.read_csv(self.espn_df_path)
+    def batch_profits(self, bet_df, outcomes):  # Top Level
+        """
+        vectorized bet_profit for the outcomes from batch_outcomes
+        """
+        profits = np.where(outcomes == "Win", bet_df['To_Win'].to_numpy(dtype=object), (-bet_df['Wager']).to_numpy(dtype=object))
+        profits[outcomes == "Push"] = 0
+        profits[pd.isnull(outcomes)] = "Not Labeled"
+        return profits
+
+    def batch_label_df(self, agent_df, espn_df):  # Top Level
+        """
+        labeling the agent's bets and profits with batch_outcomes
+        """
+        index, outcomes = self.batch_outcomes(agent_df, espn_df)
+        agent_df['Outcome'] = agent_df['Outcome'].astype(object)
+        agent_df['Profit'] = agent_df['Profit'].astype(object)
+        agent_df.loc[index, 'Outcome'] = outcomes
+        agent_df.loc[index, 'Profit'] = self.batch_profits(agent_df.loc[index], outcomes)
+        return agent_df
+
+    def row_label_df(self, agent_df, espn_df):  # Top Level
+        """
+        labeling the agent's bets one row at a time (original path, used when batched=False)
+        """
         for i, row in tqdm(agent_df.iterrows()):
             if row['Outcome'] not in ['Win', 'Loss', 'Push']:
                 home = row['Home']
@@ -61,7 +83,13 @@ class Label_Agents(Label_Predictions):
                 profit = self.bet_profit(row['Wager'], row['To_Win'], outcome)
                 row['Profit'] = profit
                 agent_df.iloc[i] = row
-        agent_df['Outcome'].fillna('Not Labeled', inplace=True)
+        return agent_df
+
+    def run_one(self, agent, batched=True):  # Run
+        agent_df = pd.read_csv(ROOT_PATH + f"/Data/Agents/{self.league}/{agent}.csv")
+        espn_df = pd.read_csv(self.espn_df_path)
+        agent_df = self.batch_label_df(agent_df, espn_df) if batched else self.row_label_df(agent_df, espn_df)
+        agent_df['Outcome'] = agent_df['Outcome'].fillna('Not Labeled')
         agent_df.to_csv(ROOT_PATH + f"/Data/Agents/{self.league}/{agent}.csv", index=False)
 
     def run_all(self):  # Run
@@ -13,7 +13,9 @@
 # ==============================================================================
 
 
+import datetime
 import sys
+import time
 from os.path import abspath, dirname
 
 import numpy as np
@@ -94,8 +96,62 @@ class Label_Predictions:
         elif bet_type == "Total":
             return self._total_outcome(home_score, away_score, bet_value, prediction)
 
-    def run_one(self, df, df_path):  # Run
-        espn_df = pd.read_csv(self.espn_df_path)
+    def game_score_df(self, espn_df):  # Top Level
+        """
+        one row of scores per (Date, Home, Away), with every game listed under both team orders
+        - so each game is found by its date and unordered team pair in a single merge
+        - listed orders come before swapped ones, so a direct match wins like in _find_espn_scores
+        - scores stay in the espn order even when swapped, same as _find_espn_scores
+        """
+        games = espn_df[['Date', 'Home', 'Away', 'Final_Status', 'Home_Final', 'Away_Final']]
+        swapped_games = games.rename(columns={'Home': 'Away', 'Away': 'Home'})
+        score_df = pd.concat([games, swapped_games], ignore_index=True)
+        return score_df.drop_duplicates(subset=['Date', 'Home', 'Away'], keep='first')
+
+    def batch_outcomes(self, df, espn_df):  # Top Level
+        """
+        finding the outcome of every row that isn't labeled Win/Loss/Push yet, with vectorized comparisons
+        - returns the index of those rows and their outcomes (None if the game isn't found or final)
+        """
+        todo_df = df[~df['Outcome'].isin(['Win', 'Loss', 'Push'])]
+        games = todo_df[['Date', 'Home', 'Away']].merge(self.game_score_df(espn_df), how='left', on=['Date', 'Home', 'Away'],
+                                                        indicator=True)
+        found = (games['_merge'] == 'both').to_numpy()
+        for home, away, date in todo_df.loc[~found, ['Home', 'Away', 'Date']].values.tolist():
+            print(home, away, date)
+
+        # * scores are truncated like int() in _find_espn_scores
+        home_score = np.trunc(pd.to_numeric(games['Home_Final'], errors='coerce').to_numpy(dtype=float))
+        away_score = np.trunc(pd.to_numeric(games['Away_Final'], errors='coerce').to_numpy(dtype=float))
+        bet_value = pd.to_numeric(todo_df['Bet_Value'], errors='coerce').to_numpy(dtype=float)
+        predicted_home = todo_df['Prediction'].astype(float).to_numpy() >= 0.5
+        bet_type = todo_df['Bet_Type'].to_numpy(dtype=object)
+
+        # * "home" is the over for totals
+        conditions = [bet_type == "Spread", bet_type == "Moneyline", bet_type == "Total"]
+        push = np.select(conditions, [(home_score + bet_value) == away_score, home_score == away_score,
+                                      (home_score + away_score) == bet_value], False)
+        home_won = np.select(conditions, [(home_score + bet_value) > away_score, home_score > away_score,
+                                          (home_score + away_score) > bet_value], False)
+        outcomes = np.where(push, "Push", np.where(home_won == predicted_home, "Win", "Loss")).astype(object)
+
+        labeled = found & games['Final_Status'].notnull().to_numpy() & ~np.isnan(home_score) & ~np.isnan(away_score)
+        outcomes[~(labeled & np.any(conditions, axis=0))] = None
+        return todo_df.index, outcomes
+
+    def batch_label_df(self, df, espn_df):  # Top Level
+        """
+        labeling the df with batch_outcomes
+        """
+        index, outcomes = self.batch_outcomes(df, espn_df)
+        df['Outcome'] = df['Outcome'].astype(object)
+        df.loc[index, 'Outcome'] = outcomes
+        return df
+
+    def row_label_df(self, df, espn_df):  # Top Level
+        """
+        labeling the df one row at a time with bet_outcome (original path, used when batched=False)
+        """
         for i, row in tqdm(df.iterrows()):
             if row['Outcome'] not in ['Win', 'Loss', 'Push']:
                 home = row['Home']
@@ -107,7 +163,53 @@ class Label_Predictions:
                 outcome = self.bet_outcome(home, away, date, bet_type, bet_value, prediction, espn_df)
                 row["Outcome"] = outcome if isinstance(outcome, str) else None if outcome is None else "Win" if outcome else "Loss"
                 df.iloc[i] = row
-        df['Outcome'].fillna('Not Labeled', inplace=True)
+        return df
+
+    def benchmark_labeling(self, num_games=1230, seed=0):  # Run
+        """
+        timing row_label_df against batch_label_df on a season of synthetic games and bets
+        - some games aren't final or are missing, some bets have home/away swapped or are already labeled
+        - checks both label the df the same way
+        """
+        rng = np.random.default_rng(seed)
+        dates = [str(datetime.date(2021, 10, 19) + datetime.timedelta(days=int(day))) for day in rng.integers(0, 170, num_games)]
+        homes = [f"Home {i}" for i in range(num_games)]
+        aways = [f"Away {i}" for i in rng.integers(0, 30, num_games)]
+        final_status = np.where(rng.random(num_games) < 0.9, "Final", None)
+        espn_df = pd.DataFrame({"Date": dates, "Home": homes, "Away": aways, "Final_Status": final_status,
+                                "Home_Final": rng.integers(80, 130, num_games), "Away_Final": rng.integers(80, 130, num_games)})
+
+        bet_types = ["Spread", "Moneyline", "Total"]
+        swapped = rng.random(num_games) < 0.1
+        bet_homes = np.where(swapped, aways, homes).tolist()
+        bet_aways = np.where(swapped, homes, aways).tolist()
+        num_bets = num_games * len(bet_types)
+        df = pd.DataFrame({"Date": dates * 3, "Home": bet_homes * 3, "Away": bet_aways * 3,
+                           "Bet_Type": [bet_type for bet_type in bet_types for _ in range(num_games)],
+                           "Bet_Value": rng.choice(np.arange(-10, 10.5, 0.5), num_bets), "Bet_ML": -110,
+                           "Prediction": rng.random(num_bets),
+                           "Outcome": rng.choice(np.array(["Win", "Loss", "Push", "Not Labeled", None], dtype=object), num_bets),
+                           "Wager": 10, "To_Win": 9.09, "Profit": None})
+        df.loc[df['Bet_Type'] == "Total", 'Bet_Value'] += 210
+        espn_df = espn_df.drop(index=rng.choice(num_games, num_games // 100, replace=False))
+
+        start = time.time()
+        row_df = self.row_label_df(df.copy(), espn_df)
+        row_time = time.time() - start
+
+        start = time.time()
+        batch_df = self.batch_label_df(df.copy(), espn_df)
+        batch_time = time.time() - start
+
+        assert row_df.astype(str).values.tolist() == batch_df.astype(str).values.tolist()
+        print(f"{num_bets} bets on {num_games} games")
+        print(f"row_label_df: {row_time:.2f}s, batch_label_df: {batch_time:.4f}s ({row_time / batch_time:.0f}x)")
+        return row_time, batch_time
+
+    def run_one(self, df, df_path, batched=True):  # Run
+        espn_df = pd.read_csv(self.espn_df_path)
+        df = self.batch_label_df(df, espn_df) if batched else self.row_label_df(df, espn_df)
+        df['Outcome'] = df['Outcome'].fillna('Not Labeled')
         df.to_csv(df_path, index=False)
 
     def run_all(self):  # Run
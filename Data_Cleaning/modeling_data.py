@@ -12,11 +12,16 @@
 # building the final df for modeling with avg past stats, and optinoal player stats
 # ==============================================================================
 
+import bisect
 import concurrent.futures
 import datetime
 import json
+import multiprocessing
 import os
+import shutil
 import sys
+import tempfile
+import time
 import warnings
 from os.path import abspath, dirname
 
@@ -28,6 +33,7 @@ if ROOT_PATH not in sys.path:
     sys.path.append(ROOT_PATH)
 
 from Data_Cleaning.player_data import Player_Data
+from Data_Cleaning.team_averages import Team_Averages
 
 warnings.filterwarnings("ignore")
 
@@ -38,12 +44,47 @@ def multithread(func, func_args):  # Multithreading
     return result
 
 
+WORKER_PLAYER_DATA = None  # set in the parent before forking, so workers share its Player_Data instead of reloading
+
+
+def _init_player_data_worker(league):  # Multiprocessing
+    """
+    loading Player_Data once per worker, only needed when workers are spawned instead of forked
+    """
+    global WORKER_PLAYER_DATA
+    if WORKER_PLAYER_DATA is None:
+        WORKER_PLAYER_DATA = Player_Data(league)
+
+
+def _run_player_data_batch(team_dates):  # Multiprocessing
+    return [WORKER_PLAYER_DATA.run(team, date) for team, date in team_dates]
+
+
+def multiprocess_player_data(player_data, team_dates, workers, batch_size):  # Multiprocessing
+    """
+    running Player_Data.run on every (team, date) in a process pool, in batches
+    - executor.map keeps the output in the same order as team_dates
+    """
+    global WORKER_PLAYER_DATA
+    WORKER_PLAYER_DATA = player_data
+    start_method = "fork" if "fork" in multiprocessing.get_all_start_methods() else "spawn"
+    batches = [team_dates[i:i + batch_size] for i in range(0, len(team_dates), batch_size)]
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context(start_method),
+                                                initializer=_init_player_data_worker, initargs=(player_data.league,)) as executor:
+        batch_results = list(tqdm(executor.map(_run_player_data_batch, batches), total=len(batches)))
+    return [result for batch_result in batch_results for result in batch_result]
+
+
 class Modeling_Data:
-    def __init__(self, league):
+    def __init__(self, league, storage="csv", player_workers=None, player_batch_size=50):
         self.league = league
+        self.storage = storage  # "csv" rewrites one file per chunk, "parquet" rewrites only the season partitions touched
+        self.player_workers = player_workers  # None uses threads for player stats, a number uses that many processes
+        self.player_batch_size = player_batch_size
+        self.modeling_folder = ROOT_PATH + f"/Data/Modeling_Data/{self.league}/"
         self.player_data = Player_Data(league)
         self.base_df, self.game_dicts = self.load_base_df_dicts()
-        self.game_dicts_new_to_old = self.game_dicts[::-1]
+        self.team_game_dates, self.team_final_games = self.build_team_game_index()
 
         # * loading ESPN Teams JSON
         with open(ROOT_PATH + f"/Data/Teams/{self.league}_Teams.json", 'r') as f:
@@ -61,6 +102,10 @@ class Modeling_Data:
         self.targets = ['Home_Covered', 'Home_Win', 'Over_Covered']
         self.all_df_cols = ['Home', 'Away', 'Date'] + self.betting_cols + self.targets + self.feature_cols
 
+        # * vectorized rolling averages for every feature col and window size
+        feature_sources = [self._feature_source_cols(feature_col) for feature_col in self.feature_cols]
+        self.team_averages = Team_Averages(self.base_df, feature_sources)
+
     def _clean_base_df(self, df):  # Specific Helper load_base_df_dicts
         """
         cleaning up the df before it's broken up into dicts
@@ -108,6 +153,25 @@ class Modeling_Data:
         game_dicts = [{col: val for col, val in zip(list(df.columns), df_row)} for df_row in df.values.tolist()]
         return df, game_dicts
 
+    def build_team_game_index(self):  # Top Level INIT
+        """
+        indexing game_dicts by team so recent games and eligibility dates don't need a full scan
+        - team_game_dates: {team: [date, ...]} for every game the team is in
+        - team_final_games: {team: ([date, ...], [game_dicts idx, ...])} for finished games only
+        - game_dicts is sorted by date, so every list is sorted too
+        """
+        team_game_dates = {}
+        team_final_games = {}
+        for i, game_dict in enumerate(self.game_dicts):
+            final = 'Final' in str(game_dict['Final_Status'])
+            for team in set([game_dict['Home'], game_dict['Away']]):
+                team_game_dates.setdefault(team, []).append(game_dict['Date'])
+                if final:
+                    final_dates, final_idxs = team_final_games.setdefault(team, ([], []))
+                    final_dates.append(game_dict['Date'])
+                    final_idxs.append(i)
+        return team_game_dates, team_final_games
+
     def _quarters_halves_final_features(self):  # Specific Helper get_feature_cols
         """
         making a list of the quarters/halves features (halves for NCAAB only)
@@ -167,18 +231,104 @@ class Modeling_Data:
         game_stats = self._game_stats_features()
         return quarters_halves_final + game_stats
 
-    def load_modeling_df(self, num_past_games, player_stats):  # Top Level
+    def _modeling_path(self, num_past_games, player_stats):  # Global Helper
         """
-        loading the existing modeling_df if it exists, else making a new one
+        path to the modeling csv, the parquet partitions live in a folder with the same name (no extension)
         """
         ps_str = "" if player_stats else "no_"
-        path = ROOT_PATH + f"/Data/Modeling_Data/{self.league}/{ps_str}player_stats_avg_{num_past_games}_past_games.csv"
-        if os.path.exists(path):
+        return self.modeling_folder + f"{ps_str}player_stats_avg_{num_past_games}_past_games.csv"
+
+    def _season(self, date):  # Global Helper
+        """
+        season a 'YYYY-MM-DD' date belongs to, named by the year it starts in (all leagues start after July)
+        """
+        year, month = int(date[:4]), int(date[5:7])
+        return year if month >= 8 else year - 1
+
+    def _write_atomic(self, df, path):  # Global Helper
+        """
+        writing to a temp file and renaming it, so a crash mid-write never leaves a half-written file
+        """
+        tmp_path = path + ".tmp"
+        if path.endswith(".parquet"):
+            df.to_parquet(tmp_path, index=False)
+        else:
+            df.to_csv(tmp_path, index=False)
+        os.replace(tmp_path, path)
+
+    def _partition_paths(self, num_past_games, player_stats):  # Global Helper
+        """
+        paths to the existing season parquet files of a modeling df
+        """
+        partition_folder = self._modeling_path(num_past_games, player_stats).replace(".csv", "/")
+        if not os.path.exists(partition_folder):
+            return []
+        return sorted(partition_folder + item for item in os.listdir(partition_folder) if item.endswith(".parquet"))
+
+    def load_modeling_df(self, num_past_games, player_stats):  # Top Level
+        """
+        loading the existing modeling_df if it exists, else making a new one
+        - in parquet mode the season partitions are used if they exist, otherwise the csv is the starting point
+        """
+        path = self._modeling_path(num_past_games, player_stats)
+        partition_paths = self._partition_paths(num_past_games, player_stats)
+        if self.storage == "parquet" and len(partition_paths) > 0:
+            df = pd.concat([pd.read_parquet(partition_path) for partition_path in partition_paths])
+            df.reset_index(inplace=True, drop=True)
+        elif os.path.exists(path):
             df = pd.read_csv(path)
         else:
             df = pd.DataFrame(columns=self.all_df_cols)
         return df
 
+    def split_seasons(self, df):  # Top Level
+        """
+        splitting a modeling df into {season: df}
+        """
+        seasons = df['Date'].map(self._season)
+        return {season: season_df.reset_index(drop=True) for season, season_df in df.groupby(seasons)}
+
+    def save_season_partitions(self, season_dfs, update_modeling_df, num_past_games, player_stats):  # Top Level
+        """
+        adding the updated rows to their season's df and rewriting only those seasons' parquet files
+        - seasons without updated games are left untouched on disk
+        """
+        partition_folder = self._modeling_path(num_past_games, player_stats).replace(".csv", "/")
+        os.makedirs(partition_folder, exist_ok=True)
+        for season, season_update_df in self.split_seasons(update_modeling_df).items():
+            old_season_df = season_dfs.get(season, pd.DataFrame(columns=update_modeling_df.columns))
+            update_keys = pd.MultiIndex.from_frame(season_update_df[['Home', 'Away', 'Date']])
+            old_keys = pd.MultiIndex.from_frame(old_season_df[['Home', 'Away', 'Date']])
+            season_df = pd.concat([old_season_df[~old_keys.isin(update_keys)], season_update_df])
+            season_df.sort_values(by=['Date', 'Home', 'Away'], inplace=True)
+            season_df.reset_index(inplace=True, drop=True)
+            self._write_atomic(season_df, partition_folder + f"{season}.parquet")
+            season_dfs[season] = season_df
+        return season_dfs
+
+    def drop_stale_partitions(self, season_dfs, modeling_df, num_past_games, player_stats):  # Top Level
+        """
+        rewriting the seasons with rows missing betting odds/targets, without those rows
+        - the csv path drops those rows from every season when it saves (updated ones are added back),
+          so parquet mode has to drop them too for export_csv to match it
+        """
+        partition_folder = self._modeling_path(num_past_games, player_stats).replace(".csv", "/")
+        stale_df = modeling_df[pd.isnull(modeling_df[self.betting_cols + self.targets]).any(axis=1)]
+        for season in sorted(set(stale_df['Date'].map(self._season))):
+            partition_path = partition_folder + f"{season}.parquet"
+            if season in season_dfs:
+                self._write_atomic(season_dfs[season], partition_path)
+            elif os.path.exists(partition_path):
+                os.remove(partition_path)
+
+    def export_csv(self, num_past_games, player_stats):  # Top Level
+        """
+        combining the parquet partitions into the modeling csv that the Modeling/ scripts read
+        """
+        df = self.load_modeling_df(num_past_games, player_stats)
+        df.sort_values(by=['Date', 'Home', 'Away'], inplace=True)
+        self._write_atomic(df, self._modeling_path(num_past_games, player_stats))
+
     def get_no_update_modeling_df(self, modeling_df):
         """
         subsetting the modeling_df into rows that are already fully built
@@ -187,6 +337,15 @@ class Modeling_Data:
         no_update_df.reset_index(inplace=True, drop=True)
         return no_update_df
 
+    def _df_keys(self, df):  # Global Helper
+        """
+        list of (home, away, date) keys for every row in a df
+        """
+        return list(zip(df['Home'], df['Away'], df['Date']))
+
+    def _game_key(self, game_dict):  # Global Helper
+        return (game_dict['Home'], game_dict['Away'], game_dict['Date'])
+
     def get_update_home_away_dates(self, modeling_df, days_since):
         """
         creating lists of (home, away, date) for games that need to be updated
@@ -198,27 +357,21 @@ class Modeling_Data:
         update_modeling_df = modeling_df[pd.isnull(modeling_df[self.betting_cols + self.targets]).any(axis=1)]
         past_date = (datetime.datetime.now() - datetime.timedelta(days=days_since)).strftime('%Y-%m-%d')
         update_modeling_df = update_modeling_df[update_modeling_df['Date'] >= past_date]
-        update_home_away_dates = [(row['Home'], row['Away'], row['Date']) for i, row in update_modeling_df.iterrows()]
+        update_home_away_dates = self._df_keys(update_modeling_df)
 
-        # * games not in modeling_df (but in /Data/{league}.csv)
-        modeling_df_home_away_dates = [(row['Home'], row['Away'], row['Date']) for i, row in modeling_df.iterrows()]
-        missing_game_dicts = [gd for gd in self.game_dicts if (gd['Home'], gd['Away'], gd['Date']) not in modeling_df_home_away_dates]
-        missing_home_away_dates = [(mgd['Home'], mgd['Away'], mgd['Date']) for mgd in missing_game_dicts]
-        missing_home_away_dates = [mhad for mhad in missing_home_away_dates if mhad[2] > past_date]
+        # * games not in modeling_df (but in /Data/{league}.csv), anti-join on the (home, away, date) key
+        modeling_df_keys = set(self._df_keys(modeling_df))
+        missing_home_away_dates = [self._game_key(gd) for gd in self.game_dicts
+                                   if (gd['Date'] > past_date) and (self._game_key(gd) not in modeling_df_keys)]
         return update_home_away_dates + missing_home_away_dates
 
     def _team_eligible_date(self, team, num_past_games):  # Specific Helper get_update_game_dicts
         """
         finding the date AFTER which a team has enough previous games to compute avg's
         """
-        count = 0
-        for i, game_dict in enumerate(self.game_dicts):
-            home = game_dict['Home']
-            away = game_dict['Away']
-            if team in [home, away]:
-                count += 1
-            if count == num_past_games:
-                return game_dict['Date']
+        team_dates = self.team_game_dates.get(team, [])
+        if len(team_dates) >= num_past_games:
+            return team_dates[num_past_games - 1]
         return "999999-12-31"
 
     def get_update_game_dicts(self, update_home_away_dates, num_past_games, days_out=5):  # Top Level
@@ -228,13 +381,16 @@ class Modeling_Data:
         - games that are not played yet ARE ALLOWED
         - games being played within the next 'days_out' days
         """
+        json_teams = set(self.json_teams)
+        roster_teams = set(self.roster_teams)
+
         # * filtering on teams being in the ESPN teams json file
         update_home_away_dates = [uhad for uhad in update_home_away_dates
-                                  if ((uhad[0] in self.json_teams) and (uhad[1] in self.json_teams))]
+                                  if ((uhad[0] in json_teams) and (uhad[1] in json_teams))]
 
         # * filtering on teams having a roster scraped
         update_home_away_dates = [uhad for uhad in update_home_away_dates
-                                  if ((uhad[0] in self.roster_teams) and (uhad[1] in self.roster_teams))]
+                                  if ((uhad[0] in roster_teams) and (uhad[1] in roster_teams))]
 
         # * filtering based on date of teams' eligibility
         team_eligible_dates = {team: self._team_eligible_date(team, num_past_games) for team in self.json_teams}
@@ -243,47 +399,37 @@ class Modeling_Data:
 
         # * filtering on days_out
         future_date = (datetime.datetime.now() + datetime.timedelta(days=days_out)).strftime('%Y-%m-%d')
-        update_home_away_dates = [uhad for uhad in update_home_away_dates if uhad[2] <= future_date]
+        update_home_away_dates = set(uhad for uhad in update_home_away_dates if uhad[2] <= future_date)
 
         # * getting the game_dicts
-        update_game_dicts = [gd for gd in self.game_dicts if (gd['Home'], gd['Away'], gd['Date']) in update_home_away_dates]
+        update_game_dicts = [gd for gd in self.game_dicts if self._game_key(gd) in update_home_away_dates]
         return update_game_dicts
 
     def _query_recent_games(self, team, date, num_past_games):  # Helping Helper _build_update_df_row_dict
         """
-        finding recent game_dicts for a team before a given date
+        finding recent game_dicts for a team before a given date, newest first
         """
-        recent_games = []
-        for game_dict in self.game_dicts_new_to_old:
-            if game_dict['Date'] >= date:
-                continue
-
-            if 'Final' not in str(game_dict['Final_Status']):
-                continue
-
-            home = game_dict['Home']
-            away = game_dict['Away']
-            if team in [home, away]:
-                recent_games.append(game_dict)
-            if len(recent_games) == num_past_games:
-                return recent_games
-        raise ValueError(f"DID NOT FIND ENOUGH GAMES for {team} on {date} with {num_past_games} past games")
+        final_dates, final_idxs = self.team_final_games.get(team, ([], []))
+        num_before = bisect.bisect_left(final_dates, date)
+        if num_before < num_past_games:
+            raise ValueError(f"DID NOT FIND ENOUGH GAMES for {team} on {date} with {num_past_games} past games")
+        recent_idxs = final_idxs[num_before - num_past_games:num_before]
+        return [self.game_dicts[idx] for idx in reversed(recent_idxs)]
 
     def _get_opp_feature_col(self, feature_col, home_feature):  # Helping Helper _avg_feature_col
         opp_feature_col = feature_col.replace("Home", "Away") if home_feature else feature_col.replace("Away", "Home")
         opp_feature_col = 'A' + opp_feature_col[1:] if home_feature else 'H' + opp_feature_col[1:]
         return opp_feature_col
 
-    def _avg_feature_col(self, feature_col, home, away, home_recent_games, away_recent_games):  # Helping Helper _build_update_df_row_dict
+    def _feature_source_cols(self, feature_col):  # Global Helper
         """
-        Computing the average value of 'feature_col' in recent games
-        - inspects home/away recent games based on name of feature_col
+        finding the columns a feature_col is averaged from
+        - home_feature is True if the feature describes the home team of the game being built
+        - a team's value comes from home_feature_col if it was home in the past game, else away_feature_col
         """
         allowed_feature = "Allowed" in feature_col
         feature_col = feature_col.replace("_Allowed", "")
         home_feature = True if feature_col[0] == 'H' else False
-        recent_games = home_recent_games if home_feature else away_recent_games
-        team = home if home_feature else away
 
         opp_feature_col = self._get_opp_feature_col(feature_col, home_feature)
         home_feature_col = feature_col if home_feature else opp_feature_col
@@ -292,6 +438,16 @@ class Modeling_Data:
         # * if we're looking for an allowed, stat, we're just looking for the opposite col
         if allowed_feature:
             home_feature_col, away_feature_col = away_feature_col, home_feature_col
+        return home_feature, home_feature_col, away_feature_col
+
+    def _avg_feature_col(self, feature_col, home, away, home_recent_games, away_recent_games):  # Helping Helper _build_update_df_row_dict
+        """
+        Computing the average value of 'feature_col' in recent games
+        - inspects home/away recent games based on name of feature_col
+        """
+        home_feature, home_feature_col, away_feature_col = self._feature_source_cols(feature_col)
+        recent_games = home_recent_games if home_feature else away_recent_games
+        team = home if home_feature else away
 
         vals = []
         for recent_game_dict in recent_games:
@@ -345,9 +501,13 @@ class Modeling_Data:
             return self.player_data.run(team, date)
 
         home_inputs = [(home_team, date) for home_team, date in zip(home_teams, dates)]
-        home_stats = multithread(run_player_data, home_inputs)
         away_inputs = [(away_team, date) for away_team, date in zip(away_teams, dates)]
-        away_stats = multithread(run_player_data, away_inputs)
+        if self.player_workers is None:
+            home_stats = multithread(run_player_data, home_inputs)
+            away_stats = multithread(run_player_data, away_inputs)
+        else:
+            all_stats = multiprocess_player_data(self.player_data, home_inputs + away_inputs, self.player_workers, self.player_batch_size)
+            home_stats, away_stats = all_stats[:len(home_inputs)], all_stats[len(home_inputs):]
 
         for home_stat, away_stat in zip(home_stats, away_stats):
             new_df.loc[len(new_df)] = home_stat + away_stat
@@ -363,14 +523,37 @@ class Modeling_Data:
             df[feature_col].fillna(value=df[feature_col].mean(), inplace=True)
         return df
 
-    def build_update_modeling_df(self, update_game_dicts, num_past_games, player_stats):  # Top Level
+    def _build_update_df_vectorized(self, update_game_dicts, num_past_games):  # Specific Helper build_update_modeling_df
+        """
+        building the same rows as _build_update_df_row_dict, using the Team_Averages rolling means
+        """
+        homes = [ugd['Home'] for ugd in update_game_dicts]
+        aways = [ugd['Away'] for ugd in update_game_dicts]
+        dates = [ugd['Date'] for ugd in update_game_dicts]
+        feature_rows = self.team_averages.feature_matrix(homes, aways, dates, num_past_games)
+
+        update_df_row_dicts = []
+        for update_game_dict, feature_row in zip(update_game_dicts, feature_rows):
+            row_dict = dict(zip(self.feature_cols, feature_row))
+            row_dict['Home'] = update_game_dict['Home']
+            row_dict['Away'] = update_game_dict['Away']
+            row_dict['Date'] = update_game_dict['Date']
+            row_dict = self._add_targets_bet_cols(row_dict, update_game_dict)
+            update_df_row_dicts.append(row_dict)
+        return pd.DataFrame(update_df_row_dicts, columns=self.all_df_cols)
+
+    def build_update_modeling_df(self, update_game_dicts, num_past_games, player_stats, vectorized=True):  # Top Level
         """
         using the update_game_dicts to build out a df with those games' values
         # optionally adding player stats
+        - vectorized uses the Team_Averages rolling means instead of averaging game_dicts one game at a time
         """
-        args = [(ugd, num_past_games) for ugd in update_game_dicts]
-        update_df_row_dicts = multithread(self._build_update_df_row_dict, args)
-        update_modeling_df = pd.DataFrame(update_df_row_dicts, columns=self.all_df_cols)
+        if vectorized:
+            update_modeling_df = self._build_update_df_vectorized(update_game_dicts, num_past_games)
+        else:
+            args = [(ugd, num_past_games) for ugd in update_game_dicts]
+            update_df_row_dicts = multithread(self._build_update_df_row_dict, args)
+            update_modeling_df = pd.DataFrame(update_df_row_dicts, columns=self.all_df_cols)
         if player_stats:
             update_modeling_df = self._add_player_stats(update_modeling_df, update_game_dicts)
         update_modeling_df = self.fill_na_values(update_modeling_df)
@@ -378,10 +561,21 @@ class Modeling_Data:
         return update_modeling_df
 
     def run(self, num_past_games, player_stats, days_since=10, days_out=10):  # Run
+        """
+        updating the modeling df, returns True if any rows were updated (parquet: if any partitions changed)
+        """
         modeling_df = self.load_modeling_df(num_past_games, player_stats)
         full_df = self.get_no_update_modeling_df(modeling_df)  # no missing betting odds/targets
         update_home_away_dates = self.get_update_home_away_dates(modeling_df, days_since)  # had's of games that need to be updated
         update_game_dicts = self.get_update_game_dicts(update_home_away_dates, num_past_games, days_out)
+        updated = len(update_game_dicts) > 0
+        season_dfs = self.split_seasons(full_df) if self.storage == "parquet" else None
+        if (self.storage == "parquet") and (len(self._partition_paths(num_past_games, player_stats)) == 0):
+            # * first parquet run, seeded with what the csv path would save: the whole csv if nothing is updated, else full_df
+            seed_df = full_df if len(update_game_dicts) > 0 else modeling_df
+            self.save_season_partitions({}, seed_df, num_past_games, player_stats)
+        elif (self.storage == "parquet") and (len(update_game_dicts) > 0):
+            self.drop_stale_partitions(season_dfs, modeling_df, num_past_games, player_stats)
 
         while len(update_game_dicts) > 0:
             games_per_iter = 2000
@@ -389,26 +583,101 @@ class Modeling_Data:
             update_game_dicts = update_game_dicts[games_per_iter:]
 
             update_modeling_df = self.build_update_modeling_df(current_ugds, num_past_games, player_stats)
-            full_df = pd.concat([full_df, update_modeling_df])
-            full_df.reset_index(inplace=True, drop=True)
-            full_df.sort_values(by=['Date', 'Home', 'Away'], inplace=True)
 
             # * saving the df
-            ps_str = "" if player_stats else "no_"
-            path = ROOT_PATH + f"/Data/Modeling_Data/{self.league}/{ps_str}player_stats_avg_{num_past_games}_past_games.csv"
-            full_df.to_csv(path, index=False)
-            print(f"{len(full_df)} rows SAVED!")
+            if self.storage == "parquet":
+                season_dfs = self.save_season_partitions(season_dfs, update_modeling_df, num_past_games, player_stats)
+                print(f"{len(update_modeling_df)} rows SAVED!")
+            else:
+                full_df = pd.concat([full_df, update_modeling_df])
+                full_df.reset_index(inplace=True, drop=True)
+                full_df.sort_values(by=['Date', 'Home', 'Away'], inplace=True)
+                self._write_atomic(full_df, self._modeling_path(num_past_games, player_stats))
+                print(f"{len(full_df)} rows SAVED!")
             print(f"{len(update_game_dicts)} games to update left")
+        return updated
+
+    def _list_update_selection(self, modeling_df, num_past_games, days_since, days_out):  # Specific Helper benchmark_update_selection
+        """
+        the original list-based update selection, only kept to benchmark against
+        """
+        past_date = (datetime.datetime.now() - datetime.timedelta(days=days_since)).strftime('%Y-%m-%d')
+        update_modeling_df = modeling_df[pd.isnull(modeling_df[self.betting_cols + self.targets]).any(axis=1)]
+        update_modeling_df = update_modeling_df[update_modeling_df['Date'] >= past_date]
+        update_home_away_dates = [(row['Home'], row['Away'], row['Date']) for i, row in update_modeling_df.iterrows()]
+        modeling_df_home_away_dates = [(row['Home'], row['Away'], row['Date']) for i, row in modeling_df.iterrows()]
+        missing_home_away_dates = [(gd['Home'], gd['Away'], gd['Date']) for gd in self.game_dicts
+                                   if (gd['Home'], gd['Away'], gd['Date']) not in modeling_df_home_away_dates]
+        update_home_away_dates += [mhad for mhad in missing_home_away_dates if mhad[2] > past_date]
+
+        update_home_away_dates = [uhad for uhad in update_home_away_dates
+                                  if (uhad[0] in self.json_teams) and (uhad[1] in self.json_teams)
+                                  and (uhad[0] in self.roster_teams) and (uhad[1] in self.roster_teams)]
+        team_eligible_dates = {team: self._team_eligible_date(team, num_past_games) for team in self.json_teams}
+        future_date = (datetime.datetime.now() + datetime.timedelta(days=days_out)).strftime('%Y-%m-%d')
+        update_home_away_dates = [uhad for uhad in update_home_away_dates if (uhad[2] > team_eligible_dates[uhad[0]])
+                                  and (uhad[2] > team_eligible_dates[uhad[1]]) and (uhad[2] <= future_date)]
+        return [gd for gd in self.game_dicts if (gd['Home'], gd['Away'], gd['Date']) in update_home_away_dates]
+
+    def benchmark_update_selection(self, num_past_games=10, player_stats=True, days_since=50, days_out=10):  # Run
+        """
+        timing the keyed update selection against the original list-based version on the real modeling_df
+        """
+        modeling_df = self.load_modeling_df(num_past_games, player_stats)
 
-    def run_all(self):  # Run
+        start = time.time()
+        update_home_away_dates = self.get_update_home_away_dates(modeling_df, days_since)
+        keyed_game_dicts = self.get_update_game_dicts(update_home_away_dates, num_past_games, days_out)
+        keyed_time = time.time() - start
+
+        start = time.time()
+        list_game_dicts = self._list_update_selection(modeling_df, num_past_games, days_since, days_out)
+        list_time = time.time() - start
+
+        assert keyed_game_dicts == list_game_dicts
+        print(f"{self.league}: {len(modeling_df)} modeling rows, {len(self.game_dicts)} games, {len(keyed_game_dicts)} to update")
+        print(f"list-based: {list_time:.2f}s, keyed: {keyed_time:.2f}s ({list_time / max(keyed_time, 1e-9):.1f}x faster)")
+        return list_time, keyed_time
+
+    def compare_storage_modes(self, num_past_games=10, player_stats=True, days_since=50, days_out=10):  # Run
+        """
+        running csv and parquet mode on copies of the same modeling csv, and checking export_csv matches the csv path
+        """
+        storage, modeling_folder = self.storage, self.modeling_folder
+        csv_name = os.path.basename(self._modeling_path(num_past_games, player_stats))
+        try:
+            with tempfile.TemporaryDirectory() as tmp_folder:
+                out_paths = {}
+                for mode in ['csv', 'parquet']:
+                    self.storage, self.modeling_folder = mode, f"{tmp_folder}/{mode}/"
+                    os.makedirs(self.modeling_folder)
+                    if os.path.exists(modeling_folder + csv_name):
+                        shutil.copy(modeling_folder + csv_name, self.modeling_folder + csv_name)
+                    self.run(num_past_games, player_stats, days_since, days_out)
+                    if mode == 'parquet':
+                        self.export_csv(num_past_games, player_stats)
+                    out_paths[mode] = self.modeling_folder + csv_name
+
+                csv_df = pd.read_csv(out_paths['csv'])
+                parquet_df = pd.read_csv(out_paths['parquet'])
+                pd.testing.assert_frame_equal(csv_df, parquet_df)
+                print(f"{self.league}: csv and parquet modes match, {len(csv_df)} rows")
+        finally:
+            self.storage, self.modeling_folder = storage, modeling_folder
+
+    def run_all(self, export=True):  # Run
         """
         runs through all the num past games with and without player stats
+        - in parquet mode, export=True rewrites a modeling csv only if its partitions changed this run,
+          export=False leaves the csv's to a separate export_csv step
         """
         for npg in [3, 5, 10, 15, 20, 25]:
             for ps in [True, False]:
                 print(f"{self.league}, {npg} past games, player stats: {ps}")
                 days_out = 10 if league != "NCAAF" else 50  # bowl season creates long gap between odds release and the game
-                self.run(npg, ps, days_since=50, days_out=days_out)
+                updated = self.run(npg, ps, days_since=50, days_out=days_out)
+                if (self.storage == "parquet") and export and updated:
+                    self.export_csv(npg, ps)
 
 
 if __name__ == '__main__':
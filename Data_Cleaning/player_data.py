@@ -13,9 +13,12 @@
 # ==============================================================================
 
 
+import bisect
 import datetime
+import functools
 import json
 import sys
+import time
 from os.path import abspath, dirname
 
 import numpy as np
@@ -25,6 +28,8 @@ ROOT_PATH = dirname(dirname(abspath(__file__)))
 if ROOT_PATH not in sys.path:
     sys.path.append(ROOT_PATH)
 
+from Data_Cleaning.player_stats_store import Player_Stats_Store
+
 
 class Player_Data:
     def __init__(self, league):
@@ -57,6 +62,7 @@ class Player_Data:
         self.positions = self.football_positions if self.football_league else self.basketball_positions
         self.pos_dict = self.football_pos_dict if self.football_league else self.basketball_pos_dict
         self.rev_pos_dict = {v: k for k, v in self.pos_dict.items()}
+        self.position_norm_dict = {**self.pos_dict, **{position: position for position in self.positions}}
         self.pos_num_dict = self.football_pos_num_dict if self.football_league else self.basketball_pos_num_dict
 
         # * stats we care about for each position
@@ -95,6 +101,21 @@ class Player_Data:
         self.avg_pos_height_dict = self.avg_pos_ht_wt_dict(height=True)
         self.avg_pos_weight_dict = self.avg_pos_ht_wt_dict(height=False)
 
+        # * player stats indexed by Player_ID, so past stats don't need a mask over the whole df
+        self.use_stats_store = True
+        store_stats = list(dict.fromkeys(stat for position in self.positions for stat in self.pos_stat_dict[position]))
+        self.stats_store = Player_Stats_Store(self.player_stats_df, store_stats)
+
+        # * height/weight/birthdate per Player_ID, so bio arrays don't need a mask over player_df
+        self.bio_dict = self.build_bio_dict()
+        self._cached_player_age = functools.lru_cache(maxsize=2 ** 16)(self._player_id_age)
+        self.player_position_dict = self.build_player_position_dict()
+
+        # * roster/injury snapshots per team, so the latest snapshot is a lookup/bisect instead of a df filter
+        self.roster_snapshots = self.build_snapshot_index(self.roster_df, 'scrape_ts')
+        self.injury_snapshots = self.build_snapshot_index(self.injury_df, 'scraped_ts')
+        self.roster_dash_name_dicts = {}
+
     def make_feature_col_names(self):  # Top Level
         """
         creating a list of all the feature columns that result from the run() method
@@ -128,6 +149,29 @@ class Player_Data:
             ht_wt_dict[position] = self._avg_player_ht_wt(position, height)
         return ht_wt_dict
 
+    def _birth_days(self, birth_dates):  # Specific Helper build_bio_dict
+        """
+        converts a series of ESPN birthdate strings to days since 1970-01-01 (None if null or malformed)
+        """
+        birth_dates = pd.Series([str(birth_date) for birth_date in birth_dates], dtype=object)
+        birth_dates = birth_dates.where(birth_dates.str.contains("/", regex=False))
+        birth_dts = pd.to_datetime(birth_dates.str.split(" (", regex=False).str[0], format="%m/%d/%Y", errors='coerce')
+        birth_days = birth_dts.to_numpy(dtype='datetime64[D]')
+        return [None if np.isnat(birth_day) else int(birth_day.astype('int64')) for birth_day in birth_days]
+
+    def build_bio_dict(self):  # Top Level
+        """
+        creating a dict of each player's bio from their first row in player_df
+        - {player_id: (height_in, weight_lb, birth_days)}, with None for null values
+        """
+        player_df = self.player_df.drop_duplicates(subset=['Player_ID'], keep='first')
+        heights = [str(height) for height in player_df['Height']]
+        heights = [self._player_height(height, "") if '"' in height else None for height in heights]
+        weights = [str(weight) for weight in player_df['Weight']]
+        weights = [self._player_weight(weight, "") if "lbs" in weight else None for weight in weights]
+        birth_days = self._birth_days(player_df['Birth_Date'])
+        return {player_id: bio for player_id, *bio in zip(player_df['Player_ID'].tolist(), heights, weights, birth_days)}
+
     def _check_nan(self, val):  # Helping Helper _split_dash_slash_cols
         """
         checking if a float value is NaN or None
@@ -173,6 +217,21 @@ class Player_Data:
 
         return player_stats_df
 
+    def build_snapshot_index(self, df, ts_col):  # Top Level
+        """
+        grouping a roster/injury df into one snapshot per (team, scrape timestamp)
+        - {team: ([sorted scrape_ts, ...], {scrape_ts: snapshot_df, ...}), ...}
+        - rows keep their original order inside each snapshot
+        """
+        snapshot_index = {}
+        for (team, scrape_ts), snapshot_df in df.groupby(['Team', ts_col], sort=False):
+            if team not in snapshot_index:
+                snapshot_index[team] = ([], {})
+            snapshot_index[team][1][scrape_ts] = snapshot_df
+        for team in snapshot_index:
+            snapshot_index[team][0].extend(sorted(snapshot_index[team][1]))
+        return snapshot_index
+
     def player_ids(self, team, date, pre_scraping):  # Top Level
         """
         finding the player_id's for the team
@@ -183,49 +242,66 @@ class Player_Data:
             team_date_df = self.player_stats_df[(self.player_stats_df["Team"] == team) & (self.player_stats_df["Date"] == date)]
             player_ids = list(team_date_df["Player_ID"])
         else:
-            team_roster_df = self.roster_df.loc[self.roster_df['Team'] == team]
-            team_roster_dts = [datetime.datetime.strptime(scrape_ts, "%Y-%m-%d %H:%M") for scrape_ts in list(set(list(team_roster_df['scrape_ts'])))]
-            most_recent_roster_scrape = max([scrape_ts for scrape_ts in team_roster_dts])  # if scrape_ts <= input_dt])
-            most_recent_team_roster_df = team_roster_df.loc[team_roster_df['scrape_ts'] == most_recent_roster_scrape.strftime("%Y-%m-%d %H:%M")]
+            most_recent_team_roster_df = self._load_team_roster(team, date)
             player_ids = list(most_recent_team_roster_df["Player_ID"])
         return player_ids
 
+    def _num_scrapes_by_date(self, scrape_tss, date):  # Global Helper
+        """
+        returns how many of the sorted 'YYYY-MM-DD HH:MM' scrape timestamps are on or before the 'YYYY-MM-DD' date
+        - scrapes from the day of the game count, so today's predictions use the roster/injuries just scraped
+        """
+        return bisect.bisect_right(scrape_tss, date + " 23:59:59")
+
+    def _latest_roster_ts(self, team, date):  # Specific Helper _load_team_roster
+        """
+        returns the scrape_ts of the team's most recent roster on or before the date
+        - falls back to the team's latest roster if none were scraped by the date
+        """
+        scrape_tss = self.roster_snapshots[team][0]
+        num_before = self._num_scrapes_by_date(scrape_tss, date)
+        return scrape_tss[num_before - 1] if num_before > 0 else scrape_tss[-1]
+
     def _load_team_roster(self, team, date):  # Specific Helper  get_pos_dict_post_scraping
         """
-        finding the most recent team roster from roster_df before a given date
+        finding the most recent team roster from roster_df on or before a given date
         """
-        df_before_date = self.roster_df.loc[(self.roster_df['Team'] == team)]  # & (self.roster_df['scrape_ts'] <= date)]
-        most_recent_roster_scrape = list(df_before_date["scrape_ts"])[-1]
-        roster_df = df_before_date.loc[df_before_date["scrape_ts"] == most_recent_roster_scrape]
-        return roster_df
+        return self.roster_snapshots[team][1][self._latest_roster_ts(team, date)]
 
     def _load_team_injuries(self, team, date):  # Specific Helper  get_pos_dict_post_scraping
         """
-        finding the most recent team injuries from injury_df before a given date
+        finding the most recent team injuries from injury_df on or before a given date
+        - empty if the team has no injury scrapes on or before the date
+        """
+        scrape_tss, snapshot_dict = self.injury_snapshots.get(team, ([], {}))
+        num_before = self._num_scrapes_by_date(scrape_tss, date)
+        return snapshot_dict[scrape_tss[num_before - 1]] if num_before > 0 else self.injury_df.iloc[0:0]
+
+    def _roster_dash_name_dict(self, team, scrape_ts):  # Specific Helper id_injury_dict
+        """
+        returns a dict of ESPN dash names to Player_ID for a roster snapshot, cached per (team, scrape_ts)
         """
-        df_before_date = self.injury_df.loc[(self.injury_df['Team'] == team) & (self.injury_df['scraped_ts'] <= date)]
-        most_recent_injury_scrape = list(df_before_date["scraped_ts"])[-1] if len(df_before_date) > 0 else list(self.injury_df['scraped_ts'])[-1]
-        injury_df = df_before_date.loc[df_before_date["scraped_ts"] == most_recent_injury_scrape]
-        return injury_df
+        if (team, scrape_ts) not in self.roster_dash_name_dicts:
+            roster_df = self.roster_snapshots[team][1][scrape_ts]
+            roster_dash_names = [name.strip().lower().replace(' ', '-') for name in list(roster_df['Player'])]
+            self.roster_dash_name_dicts[(team, scrape_ts)] = {dn: pid for dn, pid in zip(roster_dash_names, list(roster_df['Player_ID']))}
+        return self.roster_dash_name_dicts[(team, scrape_ts)]
 
-    def _dash_name_injury_dict(self, roster_df, injury_df):  # Specific Helper id_injury_dict
+    def _dash_name_injury_dict(self, espn_dn_to_pid_dict, injury_df):  # Specific Helper id_injury_dict
         """
         building a dict of player_id's to injury status
         - starting out by giving everyone in the roster a 4 (healthy), then updating if injury_df differs
         """
-        roster_dnames = [item.strip().lower().replace(' ', '-') for item in list(roster_df['Player'])]
-        dash_name_injury_dict = {roster_dname: 4 for roster_dname in roster_dnames}
+        dash_name_injury_dict = {roster_dname: 4 for roster_dname in espn_dn_to_pid_dict}
         for injury_dname, injury_status in zip(list(injury_df['Player']), list(injury_df['Status'])):
             status_first_word = injury_status.strip().split(' ')[0].lower()
             dash_name_injury_dict[injury_dname] = self.status_fw_to_num_dict[status_first_word]
         return dash_name_injury_dict
 
-    def _dash_name_to_player_id(self, covers_dash_name, roster_df):  # Specific Helper  id_injury_dict
+    def _dash_name_to_player_id(self, covers_dash_name, espn_dn_to_pid_dict):  # Specific Helper  id_injury_dict
         """
         returns the ESPN Player_ID for the dash_name input (dash_name comes from Covers!!)
         """
-        roster_dash_names = [name.strip().lower().replace(' ', '-') for name in list(roster_df['Player'])]
-        espn_dn_to_pid_dict = {dn: pid for dn, pid in zip(roster_dash_names, list(roster_df['Player_ID']))}
         if covers_dash_name in espn_dn_to_pid_dict:
             return espn_dn_to_pid_dict[covers_dash_name]
         elif covers_dash_name in self.player_matches:
@@ -240,32 +316,45 @@ class Player_Data:
         if pre_scraping:
             return {player_id: 4 for player_id in player_ids}
 
-        roster_df = self._load_team_roster(team, date)
+        espn_dn_to_pid_dict = self._roster_dash_name_dict(team, self._latest_roster_ts(team, date))
         injury_df = self._load_team_injuries(team, date)
-        dash_name_injury_dict = self._dash_name_injury_dict(roster_df, injury_df)
-        id_injury_dict = {self._dash_name_to_player_id(dash_name, roster_df): dash_name_injury_dict[dash_name]
+        dash_name_injury_dict = self._dash_name_injury_dict(espn_dn_to_pid_dict, injury_df)
+        id_injury_dict = {self._dash_name_to_player_id(dash_name, espn_dn_to_pid_dict): dash_name_injury_dict[dash_name]
                           for dash_name in dash_name_injury_dict}
         return id_injury_dict
 
-    def _find_player_position(self, player_id):  # Specific Helper pos_id_dict
+    def build_player_position_dict(self):  # Top Level
+        """
+        creating a dict of each player's position (like 'QB') from their first row in player_df
+        - ESPN names ('Quarterback') and abbreviations ('QB') both map to the abbreviation
+        - players with an unknown position are left out
+        """
+        player_df = self.player_df.drop_duplicates(subset=['Player_ID'], keep='first')
+        positions = player_df['Position'].map(self.position_norm_dict)
+        player_df = player_df[positions.notnull()]
+        return dict(zip(player_df['Player_ID'].tolist(), positions[positions.notnull()].tolist()))
+
+    def _find_player_position(self, player_id):  # Specific Helper benchmark_pos_id_dict
         """
-        given a player_id, this will find that player's position
+        given a player_id, this will find that player's position by scanning player_df
+        - only used to check/time the player_position_dict version
         """
         player = self.player_df.loc[self.player_df['Player_ID'] == player_id]
         position = list(player['Position'])[0] if len(player) > 0 else None
-        if position not in self.pos_dict or position is None:
+        if position not in self.position_norm_dict or position is None:
             return None
-        return self.pos_dict[position]
+        return self.position_norm_dict[position]
 
     def pos_id_dict(self, player_ids):  # Top Level
         """
         creates a position dict showing the player_id's available at each position
+        - the whole roster is resolved with one map against player_position_dict
         - {pos: [pos_id, pos_id, pos_id], pos: [pos_id, ...], ...}
         """
         pos_id_dict = {position: [] for position in self.positions}
-        player_positions = [self._find_player_position(player_id) for player_id in player_ids]
+        player_positions = pd.Series(player_ids, dtype=object).map(self.player_position_dict).tolist()
         for player_id, player_position in zip(player_ids, player_positions):
-            if player_position is not None:
+            if isinstance(player_position, str):
                 pos_id_dict[player_position] += [player_id]
         return pos_id_dict
 
@@ -274,6 +363,9 @@ class Player_Data:
         returns a list of a player's average stats in past_games games before 'date' for stats
           we care about for their position
         """
+        if self.use_stats_store:
+            return self.stats_store.past_stats(player_id, date, past_games, self.pos_stat_dict[position])
+
         player_stats_df = self.player_stats_df.loc[(self.player_stats_df['Player_ID'] == player_id) & (self.player_stats_df['Date'] <= date)]
         player_stats_df = player_stats_df.iloc[-past_games:]
         position_stats = self.pos_stat_dict[position]
@@ -297,47 +389,45 @@ class Player_Data:
             pos_stats_dict = {pos: sorted(pos_stats_dict[pos], key=lambda x: x[0], reverse=True) for pos in pos_stats_dict}
         return pos_stats_dict
 
-    def _player_height(self, height_str, position):  # Helping Helper _player_bio_arr
+    def _player_height(self, height_str, position):  # Helping Helper build_bio_dict
         """
         returns the height of a player in inches (or the avg at that position if null)
         """
         if '"' not in height_str:
-            return self._avg_player_ht_wt(position, height=True)
+            return self.avg_pos_height_dict[position]
         feet = int(height_str.split("'")[0])
         inches = int(height_str.split(" ")[1].split('"')[0])
         return (feet * 12) + inches
 
-    def _player_weight(self, weight_str, position):  # Helping Helper _player_bio_arr
+    def _player_weight(self, weight_str, position):  # Helping Helper build_bio_dict
         """
         returns the weight of a player in inches (or the avg at that position if null)
         """
         if "lbs" not in weight_str:
-            return self._avg_player_ht_wt(position, height=False)
+            return self.avg_pos_weight_dict[position]
         weight = weight_str.strip().split(" ")[0]
         return int(weight)
 
-    def _player_age(self, birthdate_str, date):  # Helping Helper _player_bio_arr
+    def _player_id_age(self, player_id, date):  # Helping Helper _player_bio_arr
         """
-        returns the player's age in years, or 21/26 if null
+        returns the player's age in years from the bio_dict, or 21/26 if null
+        - wrapped in an LRU cache per (player_id, date) in __init__
         """
-        if "/" not in birthdate_str:
+        birth_days = self.bio_dict[player_id][2]
+        if birth_days is None:
             return 21 if 'NCAA' in self.league else 26  # TODO update this to be better
-        birthdate_str = birthdate_str.split(" (")[0]
-        birthdate_dt = datetime.datetime.strptime(birthdate_str, "%m/%d/%Y")
-        age = datetime.datetime.strptime(date, "%Y-%m-%d") - birthdate_dt
-        return age.days / 365
+        date_days = int(np.datetime64(date, 'D').astype('int64'))
+        return (date_days - birth_days) / 365
 
     def _player_bio_arr(self, player_id, position, date):  # Specific Helper get_pos_stats_dict
         """
         returns a list of the player's height/weight/age, or the average at their position if null
         - [height, weight, age]
         """
-        player = self.player_df.loc[self.player_df['Player_ID'] == player_id]
-        height = str(player['Height'].values[0])
-        weight = str(player['Weight'].values[0])
-        birth_date = str(player['Birth_Date'].values[0])
-        arr = [self._player_height(height, position), self._player_weight(weight, position), self._player_age(birth_date, date)]
-        return arr
+        height, weight, _ = self.bio_dict[player_id]
+        height = self.avg_pos_height_dict[position] if height is None else height
+        weight = self.avg_pos_weight_dict[position] if weight is None else weight
+        return [height, weight, self._cached_player_age(player_id, date)]
 
     def get_pos_stats_dict(self, team, date, past_games, position_id_dict, id_injury_dict):  # Top Level
         """
@@ -390,6 +480,50 @@ class Player_Data:
         player_data_arr = self.pos_stats_dict_to_player_data(position_stats_dict)
         return player_data_arr
 
+    def benchmark_run(self, team_dates, past_games=10):  # Run
+        """
+        timing run() per (team, date) with and without the Player_Stats_Store, checking both give the same output
+        """
+        times = {}
+        outputs = {}
+        for use_stats_store in [False, True]:
+            self.use_stats_store = use_stats_store
+            start = time.time()
+            outputs[use_stats_store] = [self.run(team, date, past_games) for team, date in team_dates]
+            times[use_stats_store] = (time.time() - start) / len(team_dates)
+
+        assert outputs[False] == outputs[True]
+        print(f"{self.league}: {len(team_dates)} team-dates")
+        print(f"mask: {times[False] * 1000:.1f}ms per team-date, store: {times[True] * 1000:.1f}ms per team-date")
+        return times[False], times[True]
+
+    def benchmark_pos_id_dict(self, team_dates):  # Run
+        """
+        timing pos_id_dict per (team, date) roster against scanning player_df for each player
+        """
+        rosters = [self.player_ids(team, date, datetime.datetime.strptime(date, "%Y-%m-%d") < datetime.datetime(2021, 11, 2))
+                   for team, date in team_dates]
+
+        start = time.time()
+        scan_dicts = []
+        for player_ids in rosters:
+            scan_dict = {position: [] for position in self.positions}
+            for player_id in player_ids:
+                position = self._find_player_position(player_id)
+                if position is not None:
+                    scan_dict[position] += [player_id]
+            scan_dicts.append(scan_dict)
+        scan_time = (time.time() - start) / len(rosters)
+
+        start = time.time()
+        map_dicts = [self.pos_id_dict(player_ids) for player_ids in rosters]
+        map_time = (time.time() - start) / len(rosters)
+
+        assert scan_dicts == map_dicts
+        print(f"{self.league}: {len(rosters)} rosters")
+        print(f"scan: {scan_time * 1000:.2f}ms per call, map: {map_time * 1000:.2f}ms per call ({scan_time / map_time:.1f}x)")
+        return scan_time, map_time
+
 
 if __name__ == '__main__':
     league = "NFL"
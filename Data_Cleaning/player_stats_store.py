@@ -0,0 +1,77 @@
+# ==============================================================================
+# File: player_stats_store.py
+# Project: allison
+# File Created: Sunday, 18th October 2026 11:02:47 am
+# Author: Dillon Koch
+# -----
+# Last Modified: Sunday, 18th October 2026 11:02:47 am
+# Modified By: Dillon Koch
+# -----
+#
+# -----
+# columnar store of each player's game stats, used for fast past-game averages in player_data.py
+# ==============================================================================
+
+
+import sys
+from os.path import abspath, dirname
+
+import numpy as np
+import pandas as pd
+
+ROOT_PATH = dirname(dirname(abspath(__file__)))
+if ROOT_PATH not in sys.path:
+    sys.path.append(ROOT_PATH)
+
+
+class Player_Stats_Store:
+    def __init__(self, player_stats_df, stat_cols):
+        """
+        - player_stats_df is the cleaned df from Player_Data.load_clean_player_stats_df
+        - stat_cols are all the stats any position is averaged on
+        """
+        self.stat_cols = stat_cols
+        self.stat_idx = {stat: i for i, stat in enumerate(stat_cols)}
+        self.dates, self.vals, self.player_slices, self.unsorted_players = self.build_store(player_stats_df)
+
+    def build_store(self, player_stats_df):  # Top Level
+        """
+        grouping the stats by player (keeping file order within each player), and saving each player's (start, end) rows
+        - values are truncated like int() so averages match the old row-by-row version
+        - also returns the set of players whose rows aren't in date order in the csv
+        """
+        df = player_stats_df[player_stats_df['Player_ID'].notnull()]
+        df = df.sort_values(by=['Player_ID'], kind='stable')
+        dates = df['Date'].to_numpy(dtype=str)
+        vals = np.trunc(df[self.stat_cols].apply(pd.to_numeric, errors='coerce').to_numpy(dtype=float))
+
+        player_ids = df['Player_ID'].to_numpy()
+        new_player = np.ones(len(player_ids), dtype=bool)
+        new_player[1:] = player_ids[1:] != player_ids[:-1]
+        starts = np.flatnonzero(new_player)
+        ends = np.append(starts[1:], len(player_ids))
+        player_slices = {player_id: (start, end) for player_id, start, end in zip(player_ids[starts].tolist(), starts, ends)}
+
+        # * a player's rows are out of order if a date is earlier than the one before it (same player)
+        out_of_order = np.zeros(len(player_ids), dtype=bool)
+        out_of_order[1:] = (dates[1:] < dates[:-1]) & ~new_player[1:]
+        unsorted_players = set(player_ids[out_of_order].tolist())
+        return dates, vals, player_slices, unsorted_players
+
+    def past_stats(self, player_id, date, past_games, stats):  # Run
+        """
+        returns the player's average of each stat in their last 'past_games' games on or before 'date'
+        - "last" is by position in Player_Stats.csv, like the old row-by-row version
+        - null values are skipped, and stats with no values are 0
+        """
+        start, end = self.player_slices.get(player_id, (0, 0))
+        if player_id in self.unsorted_players:
+            rows = start + np.flatnonzero(self.dates[start:end] <= date)[-past_games:]
+        else:
+            end = start + np.searchsorted(self.dates[start:end], date, side='right')
+            rows = slice(max(start, end - past_games), end)
+
+        stat_vals = self.vals[rows][:, [self.stat_idx[stat] for stat in stats]]
+        counts = np.count_nonzero(~np.isnan(stat_vals), axis=0)
+        sums = np.nansum(stat_vals, axis=0)
+        return [(stat_sum / count) if count > 0 else 0 for stat_sum, count in zip(sums.tolist(), counts.tolist())]
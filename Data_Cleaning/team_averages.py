@@ -0,0 +1,106 @@
+# ==============================================================================
+# File: team_averages.py
+# Project: allison
+# File Created: Sunday, 18th October 2026 9:12:31 am
+# Author: Dillon Koch
+# -----
+# Last Modified: Sunday, 18th October 2026 9:12:31 am
+# Modified By: Dillon Koch
+# -----
+#
+# -----
+# vectorized rolling averages of team stats, used to build the modeling data
+# ==============================================================================
+
+
+import sys
+from os.path import abspath, dirname
+
+import numpy as np
+import pandas as pd
+
+ROOT_PATH = dirname(dirname(abspath(__file__)))
+if ROOT_PATH not in sys.path:
+    sys.path.append(ROOT_PATH)
+
+
+class Team_Averages:
+    def __init__(self, base_df, feature_sources, windows=(3, 5, 10, 15, 20, 25)):
+        """
+        - base_df is the cleaned /Data/{league}.csv df from Modeling_Data
+        - feature_sources is a list of (home_feature, home_feature_col, away_feature_col) for each feature col
+        """
+        self.windows = sorted(windows)
+
+        # * unique (home_col, away_col) pairs, each one is a column in the long table
+        self.stat_pairs = sorted(set((home_col, away_col) for _, home_col, away_col in feature_sources))
+        pair_idx = {pair: i for i, pair in enumerate(self.stat_pairs)}
+        self.home_feature_mask = np.array([home_feature for home_feature, _, _ in feature_sources])
+        self.feature_pair_idxs = np.array([pair_idx[(home_col, away_col)] for _, home_col, away_col in feature_sources], dtype=int)
+
+        self.dates, self.vals, self.team_slices = self.build_long_table(base_df)
+        self.window_means = self.rolling_means()
+
+    def build_long_table(self, base_df):  # Top Level
+        """
+        reshaping the finished games into one row per (team, game), sorted by team then game order
+        - each column is the team's value for a stat pair (home col if the team was home, else away col)
+        """
+        final_df = base_df[base_df['Final_Status'].astype(str).str.contains('Final')]
+        home_cols = [home_col for home_col, _ in self.stat_pairs]
+        away_cols = [away_col for _, away_col in self.stat_pairs]
+
+        teams = np.concatenate([final_df['Home'].to_numpy(dtype=object), final_df['Away'].to_numpy(dtype=object)])
+        dates = np.concatenate([final_df['Date'].to_numpy(dtype=object), final_df['Date'].to_numpy(dtype=object)])
+        order = np.concatenate([final_df.index.to_numpy(), final_df.index.to_numpy()])
+        vals = np.vstack([final_df[home_cols].to_numpy(dtype=float), final_df[away_cols].to_numpy(dtype=float)])
+
+        # * sorting by team, then by position in base_df (which is sorted by date)
+        team_codes, team_names = pd.factorize(teams)
+        sort_idx = np.lexsort((order, team_codes))
+        team_codes = team_codes[sort_idx]
+        dates = dates[sort_idx]
+        vals = vals[sort_idx]
+
+        starts = np.searchsorted(team_codes, np.arange(len(team_names)), side='left')
+        ends = np.searchsorted(team_codes, np.arange(len(team_names)), side='right')
+        team_slices = {team: (start, end) for team, start, end in zip(team_names, starts, ends)}
+        return dates, vals, team_slices
+
+    def rolling_means(self):  # Top Level
+        """
+        computing trailing means for every window in one pass over the long table
+        - sums are accumulated newest-to-oldest, the same order as Modeling_Data._avg_feature_col,
+          so the rounded values match the game_dict path exactly
+        - rows without enough earlier games hold garbage, they're never queried
+        """
+        acc = 0.0 + self.vals
+        window_means = {}
+        for k in range(1, self.windows[-1] + 1):
+            if k in self.windows:
+                window_means[k] = acc / k
+            if k < self.windows[-1]:
+                acc[k:] += self.vals[:-k]
+        return window_means
+
+    def _last_game_idx(self, team, date, num_past_games):  # Specific Helper feature_matrix
+        """
+        finding the long table row of the team's last finished game before 'date'
+        """
+        start, end = self.team_slices.get(team, (0, 0))
+        num_before = np.searchsorted(self.dates[start:end], date, side='left')
+        if num_before < num_past_games:
+            raise ValueError(f"DID NOT FIND ENOUGH GAMES for {team} on {date} with {num_past_games} past games")
+        return start + num_before - 1
+
+    def feature_matrix(self, homes, aways, dates, num_past_games):  # Run
+        """
+        returns a (games x feature_cols) array of rounded avg stats for each (home, away, date)
+        """
+        means = self.window_means[num_past_games]
+        home_idxs = [self._last_game_idx(home, date, num_past_games) for home, date in zip(homes, dates)]
+        away_idxs = [self._last_game_idx(away, date, num_past_games) for away, date in zip(aways, dates)]
+        home_vals = means[home_idxs][:, self.feature_pair_idxs]
+        away_vals = means[away_idxs][:, self.feature_pair_idxs]
+        matrix = np.where(self.home_feature_mask, home_vals, away_vals)
+        return [[round(val, 2) for val in row] for row in matrix.tolist()]
@@ -0,0 +1,146 @@
+# ==============================================================================
+# File: async_fetcher.py
+# Project: allison
+# File Created: Sunday, 18th October 2026 6:12:09 pm
+# Author: Dillon Koch
+# -----
+# Last Modified: Sunday, 18th October 2026 6:12:09 pm
+# Modified By: Dillon Koch
+# -----
+#
+# -----
+# fetching batches of pages concurrently for the urllib scrapers, rate limited per host
+# ==============================================================================
+
+
+import asyncio
+import sys
+import time
+from os.path import abspath, dirname
+from urllib.parse import urlsplit, urlunsplit
+
+import aiohttp
+from bs4 import BeautifulSoup as soup
+
+ROOT_PATH = dirname(dirname(abspath(__file__)))
+if ROOT_PATH not in sys.path:
+    sys.path.append(ROOT_PATH)
+
+
+class Token_Bucket:
+    def __init__(self, rate, burst):
+        """
+        - rate is the number of requests per second, burst is how many can go at once after a quiet period
+        """
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+
+    async def acquire(self):  # Run
+        """
+        waiting until a token is available, then taking it
+        """
+        while True:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return
+            await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class Async_Fetcher:
+    def __init__(self, rate=1, burst=2, max_concurrency=8, retries=3, backoff=2, timeout=30, host_rates=None, host_map=None):
+        """
+        - rate/burst set each host's token bucket, host_rates={host: (rate, burst)} overrides them for a host
+        - max_concurrency is the most requests in flight at once, across all hosts
+        - failed requests (connection errors, timeouts, 429 and 5xx) are retried after backoff * 2^attempt seconds
+        - host_map={host: base_url} sends a host's requests somewhere else, e.g. a local server of saved pages
+        """
+        self.rate = rate
+        self.burst = burst
+        self.max_concurrency = max_concurrency
+        self.retries = retries
+        self.backoff = backoff
+        self.timeout = aiohttp.ClientTimeout(total=timeout)
+        self.host_rates = host_rates or {}
+        self.host_map = host_map or {}
+        self.retry_statuses = {429, 500, 502, 503, 504}
+        self.headers = {'User-Agent': 'Mozilla/5.0 (Windows; U; Windows NT 5.1; en-US; rv:1.9.0.7) Gecko/2009021910 Firefox/3.0.7'}
+
+        # * buckets are kept between batches so the rate limit holds across fetch_all calls
+        self.buckets = {}
+
+    def _bucket(self, host):  # Specific Helper _fetch_one
+        if host not in self.buckets:
+            rate, burst = self.host_rates.get(host, (self.rate, self.burst))
+            self.buckets[host] = Token_Bucket(rate, burst)
+        return self.buckets[host]
+
+    def _mapped_url(self, link):  # Specific Helper _fetch_one
+        """
+        swapping the link's scheme and host for the host_map base url, if it has one
+        """
+        parts = urlsplit(link)
+        if parts.netloc not in self.host_map:
+            return link
+        base = urlsplit(self.host_map[parts.netloc])
+        return urlunsplit((base.scheme, base.netloc, parts.path, parts.query, parts.fragment))
+
+    async def _fetch_one(self, session, semaphore, link):  # Specific Helper _fetch_all
+        """
+        fetching one link's HTML, retrying with exponential backoff
+        """
+        bucket = self._bucket(urlsplit(link).netloc)
+        url = self._mapped_url(link)
+        for attempt in range(self.retries + 1):
+            await bucket.acquire()
+            try:
+                async with semaphore:
+                    async with session.get(url) as response:
+                        if response.status not in self.retry_statuses:
+                            response.raise_for_status()
+                            return (await response.read()).decode('utf-8', 'ignore')
+                        error = aiohttp.ClientResponseError(response.request_info, response.history, status=response.status,
+                                                            message=response.reason)
+            except aiohttp.ClientResponseError:
+                raise
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                error = e
+
+            if attempt == self.retries:
+                raise error
+            await asyncio.sleep(self.backoff * 2 ** attempt)
+
+    async def _fetch_all(self, links):  # Specific Helper fetch_all
+        """
+        fetching every link with one pooled session
+        """
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        connector = aiohttp.TCPConnector(limit=self.max_concurrency)
+        async with aiohttp.ClientSession(connector=connector, headers=self.headers, timeout=self.timeout) as session:
+            return await asyncio.gather(*[self._fetch_one(session, semaphore, link) for link in links], return_exceptions=True)
+
+    def fetch_all(self, links):  # Top Level
+        """
+        returns the HTML of each link, in order
+        - a link that still fails after the retries gets its exception instead of the HTML
+        """
+        return asyncio.run(self._fetch_all(links))
+
+    def fetch_sps(self, links):  # Top Level
+        """
+        same as fetch_all, but returns BeautifulSoup objects like the scrapers' get_sp1
+        """
+        return [html if isinstance(html, Exception) else soup(html, 'html.parser') for html in self.fetch_all(links)]
+
+    def get_sp1(self, link):  # Run
+        """
+        drop-in for the scrapers' get_sp1, raising if the page couldn't be fetched
+        """
+        sp = self.fetch_sps([link])[0]
+        if isinstance(sp, Exception):
+            raise sp
+        return sp
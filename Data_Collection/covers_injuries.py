@@ -15,7 +15,6 @@
 import datetime
 import os
 import sys
-import time
 import urllib.request
 from os.path import abspath, dirname
 
@@ -27,9 +26,16 @@ if ROOT_PATH not in sys.path:
     sys.path.append(ROOT_PATH)
 
 
+from Data_Collection.async_fetcher import Async_Fetcher
+
+
 class Covers_Injuries:
-    def __init__(self, league):
+    def __init__(self, league, fetcher=None):
+        """
+        - fetcher is an optional Async_Fetcher, which rate limits and retries the request
+        """
         self.league = league
+        self.fetcher = fetcher
         self.sport = "football" if self.league in ['NFL', 'NCAAF'] else 'basketball'
         self.link = f"https://www.covers.com/sport/{self.sport}/{self.league.lower()}/injuries"
 
@@ -40,6 +46,8 @@ class Covers_Injuries:
         """
         scraping HTML from a link
         """
+        if self.fetcher is not None:
+            return self.fetcher.get_sp1(link)
         user_agent = 'Mozilla/5.0 (Windows; U; Windows NT 5.1; en-US; rv:1.9.0.7) Gecko/2009021910 Firefox/3.0.7'
         headers = {'User-Agent': user_agent, }
         request = urllib.request.Request(link, None, headers)  # The assembled request
@@ -149,8 +157,8 @@ class Covers_Injuries:
 
 if __name__ == '__main__':
     # for league in ['NFL', 'NBA', 'NCAAF', 'NCAAB']:
+    fetcher = Async_Fetcher()
     for league in ['NBA']:
-        x = Covers_Injuries(league)
+        x = Covers_Injuries(league, fetcher=fetcher)
         self = x
         x.run()
-        time.sleep(5)
@@ -17,21 +17,27 @@ import copy
 import datetime
 import re
 import sys
-import time
 from os.path import abspath, dirname
 
 import numpy as np
 import pandas as pd
-from bs4 import BeautifulSoup as soup
-from selenium import webdriver
 
 ROOT_PATH = dirname(dirname(abspath(__file__)))
 if ROOT_PATH not in sys.path:
     sys.path.append(ROOT_PATH)
 
 
+from Data_Collection.html_cache import Cached_Page_Source, Html_Cache
+from Data_Collection.page_sources import Selenium_Page_Source
+from Data_Collection.write_buffer import Write_Behind_Csv
+
+
 class ESPN_Game_Scraper:
-    def __init__(self, league):
+    def __init__(self, league, page_source=None, flush_every=50, flush_seconds=60):
+        """
+        - page_source is where pages come from (see page_sources.py), selenium if not given
+        - Games.csv is saved every flush_every games or flush_seconds seconds, scraped games are journaled in between
+        """
         self.league = league
         self.football_league = league in ['NFL', 'NCAAF']
         self.link_dict = {"NFL": "nfl", "NBA": "nba", "NCAAF": "college-football", "NCAAB": "mens-college-basketball"}
@@ -51,22 +57,9 @@ class ESPN_Game_Scraper:
                                  'Offensive_Rebounds', 'Defensive_Rebounds', 'Assists', 'Steals', 'Blocks',
                                  'Total_Turnovers', 'Points_Off_Turnovers', 'Fast_Break_Points', 'Points_in_Paint',
                                  'Fouls', 'Technical_Fouls', 'Flagrant_Fouls', 'Largest_Lead']
-        self.start_selenium()
-
-    def start_selenium(self):  # Top Level
-        """
-        fires up the selenium window to start scraping
-        """
-        self.driver = webdriver.Firefox(executable_path=ROOT_PATH + "/Data_Collection/geckodriver")
-        time.sleep(1)
-
-    def get_soup_sp(self):  # Top Level
-        """
-        saves the selenium window's current page as a beautifulsoup object
-        """
-        html = self.driver.page_source
-        sp = soup(html, 'html.parser')
-        return sp
+        self.page_source = page_source or Selenium_Page_Source()
+        self.games_writer = Write_Behind_Csv(ROOT_PATH + f"/Data/ESPN/{self.league}/Games.csv", 'Game_ID', sort_col='Date',
+                                             flush_every=flush_every, flush_seconds=flush_seconds)
 
     def load_games_df(self):  # Top Level
         """
@@ -105,17 +98,19 @@ class ESPN_Game_Scraper:
         """
         Scraping HTML of the link
         """
-        time.sleep(5)
-        self.driver.get(link)
-        sp = self.get_soup_sp()
-        return sp
+        return self.page_source.get_sp1(link)
+
+    def _summary_link(self, game_id):  # Global Helper
+        return f"https://www.espn.com/{self.link_dict[self.league]}/game/_/gameId/{game_id}"
+
+    def _stats_link(self, game_id):  # Global Helper
+        return f"https://www.espn.com/{self.link_dict[self.league]}/matchup?gameId={game_id}"
 
     def scrape_summary_page(self, game_id):  # Top Level
         """
         scrapes the sp from the game summary page
         """
-        league_link_str = self.link_dict[self.league]
-        link = f"https://www.espn.com/{league_link_str}/game/_/gameId/{game_id}"
+        link = self._summary_link(game_id)
         print(link)
         sp = self._get_sp1(link)
         return sp
@@ -180,8 +175,7 @@ class ESPN_Game_Scraper:
         """
         Scrapes the HTML from ESPN for the given game_id
         """
-        league_link_str = self.link_dict[self.league]
-        link = f"https://www.espn.com/{league_link_str}/matchup?gameId={game_id}"
+        link = self._stats_link(game_id)
         print(link)
         sp = self._get_sp1(link)
         return sp
@@ -281,68 +275,140 @@ class ESPN_Game_Scraper:
 
         return new_row
 
-    def run(self):  # Run
-        # * load dataframe, update columns
-        df = self.load_games_df()
-        df = self.add_new_df_cols(df)
-
+    def games_to_scrape(self, df):  # Top Level
+        """
+        finding the rows of games that need to be scraped
+        - skipping games that are already Final, and upcoming games with pregame data scraped
+        """
+        indices = []
         for i, row in df.iterrows():
-            try:
-                print(f"{i}/{len(df)}")
-                # * if the game is already Final and scraped, move on
-                game_is_final = 'Final' in str(row['Final_Status'])
-                if game_is_final:
-                    continue
-
-                # * If we've scraped pregame data, and the game's not over, move on
-                pregame_data_scraped = row['Home'] not in ['', None, np.nan]
-                today_past_game_date = self.check_today_past_game_date(list(row))
-                if pregame_data_scraped and (not today_past_game_date):
-                    continue
-
-                # * scraping now that we know we need to (starting row over from first 3 vals)
-                game_id = row['Game_ID']
-                try:
-                    summary_sp = self.scrape_summary_page(game_id)
-                except Exception as e:
-                    print('ERROR SCRAPING SUMMARY')
-                    print(e)
-                    continue
-                final_status = self.final_status(summary_sp)
-                new_row = copy.deepcopy(list(row[:3]))
-
-                # * always scraping pregame data again
-                new_row = self.scrape_date(new_row, summary_sp)
-                new_row = self.scrape_teams(new_row, summary_sp)
-                new_row = self.scrape_team_records(new_row, summary_sp)
-                new_row = self.scrape_network(new_row, summary_sp)
-                new_row.append(final_status)
-
-                # * scraping stats if the game's over
-                today_past_game_date = self.check_today_past_game_date(new_row)
-                if today_past_game_date:
-                    stats_sp = self.scrape_stats_page(game_id)
-                    new_row = self.scrape_halves(new_row, stats_sp, home=True)
-                    new_row = self.scrape_quarters_OT(new_row, stats_sp, home=True)
-                    new_row = self.scrape_halves(new_row, stats_sp, home=False)
-                    new_row = self.scrape_quarters_OT(new_row, stats_sp, home=False)
-                    new_row = self.scrape_final_scores(new_row, stats_sp)
-                    new_row = self.scrape_stats(new_row, stats_sp)
-                else:
-                    num_cols = len(self.football_stats) if self.football_league else len(self.basketball_stats)
-                    new_row.extend([None] * (16 + (num_cols * 2)))
+            # * if the game is already Final and scraped, move on
+            game_is_final = 'Final' in str(row['Final_Status'])
+            if game_is_final:
+                continue
+
+            # * If we've scraped pregame data, and the game's not over, move on
+            pregame_data_scraped = row['Home'] not in ['', None, np.nan]
+            today_past_game_date = self.check_today_past_game_date(list(row))
+            if pregame_data_scraped and (not today_past_game_date):
+                continue
+            indices.append(i)
+        return indices
+
+    def summary_row(self, row, summary_sp):  # Top Level
+        """
+        starting the row over from the first 3 vals, then adding the pregame data from the summary page
+        """
+        final_status = self.final_status(summary_sp)
+        new_row = copy.deepcopy(list(row[:3]))
+        new_row = self.scrape_date(new_row, summary_sp)
+        new_row = self.scrape_teams(new_row, summary_sp)
+        new_row = self.scrape_team_records(new_row, summary_sp)
+        new_row = self.scrape_network(new_row, summary_sp)
+        new_row.append(final_status)
+        return new_row
 
-                df.loc[i] = new_row
-                df = df.sort_values(by=['Date'])
-                df.to_csv(ROOT_PATH + f"/Data/ESPN/{self.league}/Games.csv", index=False)
+    def stats_row(self, new_row, stats_sp):  # Top Level
+        """
+        adding the scores and stats from the matchup page, or None's if the game hasn't happened yet
+        """
+        if stats_sp is None:
+            num_cols = len(self.football_stats) if self.football_league else len(self.basketball_stats)
+            new_row.extend([None] * (16 + (num_cols * 2)))
+            return new_row
+
+        new_row = self.scrape_halves(new_row, stats_sp, home=True)
+        new_row = self.scrape_quarters_OT(new_row, stats_sp, home=True)
+        new_row = self.scrape_halves(new_row, stats_sp, home=False)
+        new_row = self.scrape_quarters_OT(new_row, stats_sp, home=False)
+        new_row = self.scrape_final_scores(new_row, stats_sp)
+        new_row = self.scrape_stats(new_row, stats_sp)
+        return new_row
+
+    def scrape_batch(self, df, indices):  # Top Level
+        """
+        scraping the games at 'indices' with one get_sps call for their summary pages,
+        and one for the matchup pages of games that have been played
+        - returns {index: new_row} for the games scraped without errors
+        """
+        game_ids = [df.loc[i, 'Game_ID'] for i in indices]
+        summary_sps = self.page_source.get_sps([self._summary_link(game_id) for game_id in game_ids])
+
+        new_rows = {}
+        for i, summary_sp in zip(indices, summary_sps):
+            if isinstance(summary_sp, Exception):
+                print('ERROR SCRAPING SUMMARY')
+                print(summary_sp)
+                continue
+            try:
+                new_rows[i] = self.summary_row(df.loc[i], summary_sp)
             except AttributeError as e:
                 print(e)
                 print("ATTRIBUTE ERROR")
 
+        # * scraping stats if the game's over
+        played = [i for i, new_row in new_rows.items() if self.check_today_past_game_date(new_row)]
+        stats_sps = self.page_source.get_sps([self._stats_link(df.loc[i, 'Game_ID']) for i in played])
+        stats_sp_dict = dict(zip(played, stats_sps))
+        for i in list(new_rows):
+            stats_sp = stats_sp_dict.get(i)
+            try:
+                if isinstance(stats_sp, Exception):
+                    raise stats_sp
+                new_rows[i] = self.stats_row(new_rows[i], stats_sp)
+            except Exception as e:
+                print(e)
+                print("ERROR SCRAPING STATS")
+                del new_rows[i]
+        return new_rows
+
+    def scrape_games(self, df, indices):  # Top Level
+        """
+        scraping the games at 'indices' in batches
+        - each scraped row is journaled right away, Games.csv is rewritten when games_writer is due
+        """
+        # * scraped values are strings, so numeric columns read from the csv have to be able to hold them
+        df = df.astype(object)
+        batch_size = self.page_source.batch_size
+        for start in range(0, len(indices), batch_size):
+            print(f"{start}/{len(indices)} games to scrape")
+            new_rows = self.scrape_batch(df, indices[start:start + batch_size])
+            for i, new_row in new_rows.items():
+                df.loc[i] = new_row
+                self.games_writer.journal(dict(zip(df.columns, new_row)))
+            if self.games_writer.due():
+                df = self.games_writer.flush(df)
+
+        if self.games_writer.num_pending > 0:
+            df = self.games_writer.flush(df)
+        return df
+
+    def reparse_cache(self):  # Run
+        """
+        re-running the parsers over every game with a cached summary page, without the network
+        - for after changing _clean_stat_name or the stat columns
+        - page_source needs to be an offline Cached_Page_Source from html_cache.py
+        """
+        df = self.load_games_df()
+        df = self.add_new_df_cols(df)
+        df = self.games_writer.replay(df)
+        indices = [i for i, game_id in df['Game_ID'].items() if self.page_source.cache.has(self._summary_link(game_id))]
+        self.scrape_games(df, indices)
+
+    def run(self):  # Run
+        # * load dataframe, update columns
+        df = self.load_games_df()
+        df = self.add_new_df_cols(df)
+
+        # * picking up games scraped by an interrupted run before deciding what to scrape
+        df = self.games_writer.replay(df)
+        indices = self.games_to_scrape(df)
+        self.scrape_games(df, indices)
+
 
 if __name__ == '__main__':
     # for league in ['NFL', 'NBA', 'NCAAF', 'NCAAB']:
     for league in ['NBA']:
-        x = ESPN_Game_Scraper(league)
+        x = ESPN_Game_Scraper(league, page_source=Cached_Page_Source(Html_Cache(), Selenium_Page_Source()))
         self = x
         x.run()
@@ -12,6 +12,7 @@
 # Scraping players stats from ESPN.com for each game since 2007
 # ==============================================================================
 
+import csv
 import os
 import sys
 import time
@@ -20,19 +21,27 @@ from os.path import abspath, dirname
 
 import numpy as np
 import pandas as pd
-from bs4 import BeautifulSoup as soup
-from selenium import webdriver
 
 ROOT_PATH = dirname(dirname(abspath(__file__)))
 if ROOT_PATH not in sys.path:
     sys.path.append(ROOT_PATH)
 
 
+from Data_Collection.html_cache import Cached_Page_Source, Html_Cache
+from Data_Collection.page_sources import Selenium_Page_Source
+
+
 class ESPN_Player_Stats:
-    def __init__(self, league):
+    def __init__(self, league, page_source=None, append_only=True, compact_every=1000):
+        """
+        - page_source is where box scores come from (see page_sources.py), selenium if not given
+        - append_only adds each game's rows to the end of Player_Stats.csv instead of rewriting the file,
+          and compacts it every compact_every games
+        """
         # ! league/path setup
         self.league = league
         self.stats_path = ROOT_PATH + f"/Data/ESPN/{self.league}/Player_Stats.csv"
+        self.pending_path = self.stats_path + ".pending"  # Player_Stats.csv's size before an append that hasn't finished
         self.football_league = league in ['NFL', 'NCAAF']
 
         # ! football stat columns
@@ -58,22 +67,9 @@ class ESPN_Player_Stats:
         self.columns = self.football_cols if self.football_league else self.basketball_cols
         self.columns = ['Game_ID', 'Date', 'Team', 'Player', 'Player_ID', 'Position'] + self.columns
 
-        self.start_selenium()
-
-    def start_selenium(self):  # Top Level
-        """
-        fires up the selenium window to start scraping
-        """
-        self.driver = webdriver.Firefox(executable_path=ROOT_PATH + "/Data_Collection/geckodriver")
-        time.sleep(1)
-
-    def get_soup_sp(self):  # Top Level
-        """
-        saves the selenium window's current page as a beautifulsoup object
-        """
-        html = self.driver.page_source
-        sp = soup(html, 'html.parser')
-        return sp
+        self.page_source = page_source or Selenium_Page_Source()
+        self.append_only = append_only
+        self.compact_every = compact_every
 
     def make_load_df(self):  # Top Level
         """
@@ -91,7 +87,7 @@ class ESPN_Player_Stats:
         games_df = pd.read_csv(games_path)
         games_df = games_df.loc[games_df['Final_Status'].notnull()]
         games_df_game_ids = list(games_df['Game_ID'])
-        stats_df_game_ids = list(stats_df['Game_ID'])
+        stats_df_game_ids = set(stats_df['Game_ID'])
         new_game_ids = [item for item in games_df_game_ids if item not in stats_df_game_ids]
         new_games_df = games_df.loc[games_df['Game_ID'].isin(new_game_ids)]
         dates = list(new_games_df['Date'])
@@ -116,12 +112,7 @@ class ESPN_Player_Stats:
         """
         scraping HTML from a link
         """
-        self.driver.get(link)
-        sp = self.get_soup_sp()
-        print('start sleep')
-        time.sleep(5)
-        print('end sleep')
-        return sp
+        return self.page_source.get_sp1(link)
 
     def _sp_section_to_rows(self, sp_section):  # Global Helper
         """
@@ -344,7 +335,170 @@ class ESPN_Player_Stats:
         print(str(list(stats_df['Date'])[-1]) + " last date")
         return stats_df
 
+    def _write_csv(self, stats_df):  # Global Helper
+        """
+        writing the whole stats_df to a temp file and renaming it over Player_Stats.csv, so it's never half written
+        """
+        stats_df.to_csv(self.stats_path + ".tmp", index=None)
+        os.replace(self.stats_path + ".tmp", self.stats_path)
+
+    def _csv_header(self):  # Specific Helper append_csv
+        """
+        returns the columns in Player_Stats.csv's header, or None if it's missing or empty
+        """
+        if (not os.path.exists(self.stats_path)) or (os.path.getsize(self.stats_path) == 0):
+            return None
+        with open(self.stats_path, 'r', newline='') as f:
+            return next(csv.reader(f))
+
+    def repair_tail(self):  # Top Level
+        """
+        removing a game's rows left by a run that crashed in the middle of appending them
+        - if there's a .pending file, the csv is cut back to the size it had before that game's append,
+          so the game's Game_ID isn't in the csv and it's scraped again
+        - otherwise only a partly written last line is cut off
+        """
+        if os.path.exists(self.pending_path):
+            with open(self.pending_path, 'r') as f:
+                size = f.read().strip()
+            if size and os.path.exists(self.stats_path):
+                with open(self.stats_path, 'rb+') as f:
+                    f.truncate(int(size))
+                print("removed a partly appended game from the end of Player_Stats.csv")
+            os.remove(self.pending_path)
+            return
+
+        if (not os.path.exists(self.stats_path)) or (os.path.getsize(self.stats_path) == 0):
+            return
+        with open(self.stats_path, 'rb+') as f:
+            f.seek(-1, os.SEEK_END)
+            if f.read(1) == b"\n":
+                return
+            # * stepping back a chunk at a time to find the last complete line
+            end = f.tell()
+            while end > 0:
+                start = max(0, end - 65536)
+                f.seek(start)
+                last_newline = f.read(end - start).rfind(b"\n")
+                if last_newline != -1:
+                    f.truncate(start + last_newline + 1)
+                    print("removed a partly written row from the end of Player_Stats.csv")
+                    return
+                end = start
+            f.truncate(0)
+
+    def load_game_ids_df(self):  # Top Level
+        """
+        loading just the Game_ID column from Player_Stats.csv, all load_new_game_ids_date_home_away needs
+        """
+        if self._csv_header() is None:
+            return pd.DataFrame(columns=['Game_ID'])
+        return pd.read_csv(self.stats_path, usecols=['Game_ID'])
+
+    def _append_rows(self, new_df, header):  # Specific Helper append_csv
+        """
+        appending rows to the csv, with the csv's size saved to the .pending file until they're synced to disk
+        - an append that fails is rolled back right away, a crash is rolled back by repair_tail on the next run
+        """
+        with open(self.pending_path, 'w') as f:
+            f.write(str(os.path.getsize(self.stats_path)))
+            f.flush()
+            os.fsync(f.fileno())
+
+        try:
+            with open(self.stats_path, 'a', newline='') as f:
+                f.write(new_df.reindex(columns=header).to_csv(index=None, header=False))
+                f.flush()
+                os.fsync(f.fileno())
+        except BaseException:
+            self.repair_tail()
+            raise
+        os.remove(self.pending_path)
+
+    def append_csv(self, player_stats_dicts):  # Top Level
+        """
+        appending a game's rows to Player_Stats.csv, in the column order of the file's header
+        - if the game has a column the header doesn't, the file is rewritten once with it added
+        """
+        new_df = pd.DataFrame(player_stats_dicts)
+        new_df.replace('-', np.nan, inplace=True)
+        if len(new_df) == 0:
+            return
+
+        header = self._csv_header()
+        if header is None:
+            self._write_csv(new_df)
+        elif len(set(new_df.columns) - set(header)) > 0:
+            self._write_csv(pd.concat([pd.read_csv(self.stats_path), new_df]))
+        else:
+            self._append_rows(new_df, header)
+        print(f"{len(new_df)} rows added")
+        print(f"{list(new_df['Date'])[-1]} last date")
+
+    def compact(self):  # Top Level
+        """
+        rewriting Player_Stats.csv without duplicate rows
+        """
+        stats_df = pd.read_csv(self.stats_path)
+        num_rows = len(stats_df)
+        stats_df = stats_df.drop_duplicates()
+        self._write_csv(stats_df)
+        print(f"compacted Player_Stats.csv from {num_rows} to {len(stats_df)} rows")
+
+    def reparse_cache(self):  # Run
+        """
+        re-scraping every game in Player_Stats.csv that has a cached box score, without the network
+        - for after changing the stat columns or parsers
+        - page_source needs to be an offline Cached_Page_Source from html_cache.py
+        """
+        stats_df = self.make_load_df()
+        games_df = pd.read_csv(ROOT_PATH + f"/Data/ESPN/{self.league}/Games.csv")
+        games_df = games_df.loc[games_df['Game_ID'].isin(stats_df['Game_ID'])]
+
+        reparsed_game_ids = []
+        player_stats_dicts = []
+        for game_id, date, home_team, away_team in zip(games_df['Game_ID'], games_df['Date'], games_df['Home'], games_df['Away']):
+            stats_link = self.get_stats_link(game_id)
+            if not self.page_source.cache.has(stats_link):
+                continue
+            try:
+                player_stats_dicts += self.scrape_stats(stats_link, game_id, date, home_team, away_team)
+                reparsed_game_ids.append(game_id)
+            except Exception as e:
+                print(e)
+
+        new_df = pd.DataFrame(player_stats_dicts, columns=self.columns)
+        new_df.replace('-', np.nan, inplace=True)
+        stats_df = pd.concat([stats_df.loc[~stats_df['Game_ID'].isin(reparsed_game_ids)], new_df])
+        self._write_csv(stats_df)
+        print(f"reparsed {len(reparsed_game_ids)} games, {len(stats_df)} rows")
+        return stats_df
+
+    def run_append_only(self):  # Run
+        """
+        scraping new games and appending their rows, so memory and I/O per game don't grow with Player_Stats.csv
+        """
+        self.repair_tail()
+        game_ids_df = self.load_game_ids_df()
+        new_game_ids, dates, home_teams, away_teams = self.load_new_game_ids_date_home_away(game_ids_df)
+        for i, (new_game_id, date, home_team, away_team) in enumerate(zip(new_game_ids, dates, home_teams, away_teams)):
+            try:
+                print(f"{i}/{len(new_game_ids)}")
+                stats_link = self.get_stats_link(new_game_id)
+                player_stats_dicts = self.scrape_stats(stats_link, new_game_id, date, home_team, away_team)
+                self.append_csv(player_stats_dicts)
+                if (i + 1) % self.compact_every == 0:
+                    self.compact()
+            except Exception as e:
+                print(e)
+                print("SLEEPING 10 SECONDS")
+                time.sleep(10)
+
     def run(self):  # Run
+        if self.append_only:
+            self.run_append_only()
+            return
+
         stats_df = self.make_load_df()
         new_game_ids, dates, home_teams, away_teams = self.load_new_game_ids_date_home_away(stats_df)
         for i, (new_game_id, date, home_team, away_team) in enumerate(zip(new_game_ids, dates, home_teams, away_teams)):
@@ -363,6 +517,6 @@ class ESPN_Player_Stats:
 if __name__ == '__main__':
     # for league in ['NFL', 'NBA', 'NCAAF', 'NCAAB']:
     for league in ['NBA']:
-        x = ESPN_Player_Stats(league)
+        x = ESPN_Player_Stats(league, page_source=Cached_Page_Source(Html_Cache(), Selenium_Page_Source()))
         self = x
         x.run()
@@ -28,9 +28,17 @@ if ROOT_PATH not in sys.path:
     sys.path.append(ROOT_PATH)
 
 
+from Data_Collection.async_fetcher import Async_Fetcher
+
+
 class ESPN_Players:
-    def __init__(self, league):
+    def __init__(self, league, fetcher=None, batch_size=50):
+        """
+        - fetcher is an Async_Fetcher, which fetches batch_size bio pages at a time instead of one every 5 seconds
+        """
         self.league = league
+        self.fetcher = fetcher
+        self.batch_size = batch_size
         self.df_cols = ['Player_ID', 'Player', 'Team', 'Number', 'Position', 'Height', 'Weight',
                         'Birth_Date', 'Birth_Place', 'College', 'Draft_Year', 'Draft_Round', 'Draft_Pick', 'Draft_Team',
                         'Experience', 'Status', 'Team_History', 'Career_Highlights', 'scrape_ts']
@@ -165,14 +173,19 @@ class ESPN_Players:
             highlights_str += count_name + ' ' + seasons + ', '
         return highlights_str[:-2]
 
-    def scrape_player_data(self, player_id):  # Top Level
+    def _player_link(self, player_id):  # Global Helper
+        link = f"https://www.espn.com/{self.league.lower()}/player/bio/_/id/{int(player_id)}/"
+        return link.replace('ncaaf', 'college-football').replace('ncaab', 'mens-college-basketball')
+
+    def scrape_player_data(self, player_id, sp=None):  # Top Level
         """
         scraping data from the player's ESPN bio
+        - sp is the bio page if it was already fetched
         """
-        link = f"https://www.espn.com/{self.league.lower()}/player/bio/_/id/{int(player_id)}/"
-        link = link.replace('ncaaf', 'college-football').replace('ncaab', 'mens-college-basketball')
-        print(link)
-        sp = self._get_sp1(link)
+        if sp is None:
+            link = self._player_link(player_id)
+            print(link)
+            sp = self._get_sp1(link)
         header_sp = sp.find('div', attrs={'class': 'ResponsiveWrapper'})
         bio_sp = sp.find('section', attrs={'class': 'Card Bio'})
         bio_items = bio_sp.find_all('div', attrs={'class': 'Bio__Item n8 mb4'})
@@ -213,11 +226,35 @@ class ESPN_Players:
         player_df.loc[len(player_df)] = new_row
         return player_df
 
+    def run_batches(self, player_df, unscraped_player_ids):  # Top Level
+        """
+        fetching the bio pages batch_size at a time with the fetcher, saving after each batch
+        """
+        for start in range(0, len(unscraped_player_ids), self.batch_size):
+            print(f"{start}/{len(unscraped_player_ids)}")
+            player_ids = unscraped_player_ids[start:start + self.batch_size]
+            sps = self.fetcher.fetch_sps([self._player_link(player_id) for player_id in player_ids])
+            for player_id, sp in zip(player_ids, sps):
+                try:
+                    if isinstance(sp, Exception):
+                        raise sp
+                    player_dict = self.scrape_player_data(player_id, sp)
+                    player_df = self.player_dict_to_df(player_id, player_df, player_dict)
+                    print(player_dict['Name'])
+                except Exception as e:
+                    print(e)
+                    print(f"{player_id} failed")
+            player_df.to_csv(f"{ROOT_PATH}/Data/ESPN/{self.league}/Players.csv", index=False)
+
     def run(self):  # Run
         player_df = self.load_player_df()
         stats_df = self.load_stats_df()
         roster_df = self.load_roster_df()
         unscraped_player_ids = self.get_unscraped_player_ids(player_df, stats_df, roster_df)
+        if self.fetcher is not None:
+            self.run_batches(player_df, unscraped_player_ids)
+            return
+
         for i, unscraped_player_id in enumerate(unscraped_player_ids):
             try:
                 print(f"{i}/{len(unscraped_player_ids)}")
@@ -232,6 +269,7 @@ class ESPN_Players:
 
 if __name__ == '__main__':
     # for league in ["NFL", "NBA", "NCAAF", "NCAAB"]:
+    fetcher = Async_Fetcher()
     for league in ['NBA']:
-        x = ESPN_Players(league)
+        x = ESPN_Players(league, fetcher=fetcher)
         x.run()
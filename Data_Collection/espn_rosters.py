@@ -29,9 +29,16 @@ if ROOT_PATH not in sys.path:
     sys.path.append(ROOT_PATH)
 
 
+from Data_Collection.async_fetcher import Async_Fetcher
+
+
 class ESPN_Rosters:
-    def __init__(self, league):
+    def __init__(self, league, fetcher=None):
+        """
+        - fetcher is an Async_Fetcher, which fetches every roster page in one batch instead of one every 5 seconds
+        """
         self.league = league
+        self.fetcher = fetcher
         self.df_cols = ['Team', 'Player', 'Player_ID', 'scrape_ts']
         self.scraped_ts = datetime.datetime.now().strftime("%Y-%m-%d %H:%M")
 
@@ -73,11 +80,12 @@ class ESPN_Rosters:
         time.sleep(5)
         return sp
 
-    def scrape_roster(self, roster_link, team, df):  # Top Level
+    def scrape_roster(self, roster_link, team, df, sp=None):  # Top Level
         """
         scrapes the roster from each roster_link to a dataframe
+        - sp is the roster page if it was already fetched
         """
-        sp = self._get_sp1(roster_link)
+        sp = self._get_sp1(roster_link) if sp is None else sp
         table_sp = sp.find('div', attrs={'class': 'Wrapper Card__Content'})
         player_sps = table_sp.find_all('tr', attrs={'class': 'Table__TR Table__TR--lg Table__even'})
         for player_sp in player_sps:
@@ -90,9 +98,28 @@ class ESPN_Rosters:
             df.loc[len(df)] = new_row
         return df
 
+    def run_batch(self, df, roster_links, teams):  # Top Level
+        """
+        fetching all the roster pages at once with the fetcher
+        """
+        sps = self.fetcher.fetch_sps(roster_links)
+        for i, (roster_link, team, sp) in enumerate(zip(roster_links, teams, sps)):
+            print(f"{i} - {team} - {roster_link}")
+            try:
+                if isinstance(sp, Exception):
+                    raise sp
+                df = self.scrape_roster(roster_link, team, df, sp)
+            except Exception as e:
+                print(f"{roster_link} failed with {e}")
+        df.to_csv(ROOT_PATH + f"/Data/ESPN/{self.league}/Rosters.csv", index=False)
+
     def run(self):  # Run
         df = self.load_df()
         roster_links, teams = self.load_roster_links()
+        if self.fetcher is not None:
+            self.run_batch(df, roster_links, teams)
+            return
+
         for i, (roster_link, team) in enumerate(zip(roster_links, teams)):
             print(f"{i} - {team} - {roster_link}")
             try:
@@ -105,7 +132,8 @@ class ESPN_Rosters:
 
 if __name__ == '__main__':
     # for league in ['NFL', 'NBA', 'NCAAF', 'NCAAB']:
+    fetcher = Async_Fetcher()
     for league in ['NBA']:
-        x = ESPN_Rosters(league)
+        x = ESPN_Rosters(league, fetcher=fetcher)
         self = x
         x.run()
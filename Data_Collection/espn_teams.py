@@ -29,9 +29,16 @@ if ROOT_PATH not in sys.path:
     sys.path.append(ROOT_PATH)
 
 
+from Data_Collection.async_fetcher import Async_Fetcher
+
+
 class ESPN_Team_Scraper:
-    def __init__(self, league):
+    def __init__(self, league, fetcher=None):
+        """
+        - fetcher is an optional Async_Fetcher, which rate limits and retries the request
+        """
         self.league = league
+        self.fetcher = fetcher
         self.url_base = "https://www.espn.com/"
         self.url_endings = {"NFL": "nfl/teams",
                             "NBA": "nba/teams",
@@ -62,6 +69,8 @@ class ESPN_Team_Scraper:
         """
         scrapes the HTML from a link
         """
+        if self.fetcher is not None:
+            return self.fetcher.get_sp1(link)
         time.sleep(2)
         user_agent = 'Mozilla/5.0 (Windows; U; Windows NT 5.1; en-US; rv:1.9.0.7) Gecko/2009021910 Firefox/3.0.7'
         headers = {'User-Agent': user_agent, }
@@ -127,7 +136,8 @@ class ESPN_Team_Scraper:
 
 
 if __name__ == '__main__':
+    fetcher = Async_Fetcher()
     for league in ["NFL", "NCAAF", "NBA", "NCAAB"]:
         print(league)
-        x = ESPN_Team_Scraper(league)
+        x = ESPN_Team_Scraper(league, fetcher=fetcher)
         x.run()
@@ -0,0 +1,130 @@
+# ==============================================================================
+# File: html_cache.py
+# Project: allison
+# File Created: Sunday, 18th October 2026 7:48:26 pm
+# Author: Dillon Koch
+# -----
+# Last Modified: Sunday, 18th October 2026 7:48:26 pm
+# Modified By: Dillon Koch
+# -----
+#
+# -----
+# on-disk cache of the raw HTML the ESPN scrapers download, so finished games are never downloaded twice
+# and the parsers can be re-run over old pages without the network
+# ==============================================================================
+
+
+import gzip
+import hashlib
+import json
+import os
+import re
+import sys
+import time
+from os.path import abspath, dirname
+
+ROOT_PATH = dirname(dirname(abspath(__file__)))
+if ROOT_PATH not in sys.path:
+    sys.path.append(ROOT_PATH)
+
+
+from Data_Collection.page_sources import Page_Source_Parent
+
+
+def final_game_page(link, html):  # Global Helper
+    """
+    True if the page's game status says Final, the same span ESPN_Game_Scraper.final_status reads
+    """
+    return re.search(r'class="game-time status-detail"[^>]*>\s*Final', html) is not None
+
+
+class Html_Cache:
+    def __init__(self, folder=ROOT_PATH + "/Data/HTML_Cache"):
+        """
+        - pages are gzipped to /blobs/ and named by the sha256 of their HTML, so identical pages are stored once
+        - index.jsonl has a line for every (url, fetch time), the latest line for a url is the one used
+        """
+        self.folder = folder
+        self.index_path = os.path.join(self.folder, "index.jsonl")
+        self.index = self.load_index()
+
+    def load_index(self):  # Top Level
+        """
+        loading {url: latest index entry} from index.jsonl
+        """
+        index = {}
+        if os.path.exists(self.index_path):
+            with open(self.index_path, 'r') as f:
+                for line in f:
+                    if line.strip():
+                        entry = json.loads(line)
+                        index[entry['url']] = entry
+        return index
+
+    def _blob_path(self, sha):  # Global Helper
+        return os.path.join(self.folder, "blobs", sha[:2], sha + ".html.gz")
+
+    def put(self, url, html, final):  # Top Level
+        """
+        saving a page to the cache
+        - final pages never expire, others expire after the ttl passed to get
+        """
+        sha = hashlib.sha256(html.encode('utf-8')).hexdigest()
+        blob_path = self._blob_path(sha)
+        if not os.path.exists(blob_path):
+            os.makedirs(dirname(blob_path), exist_ok=True)
+            with gzip.open(blob_path + ".tmp", 'wt', encoding='utf-8') as f:
+                f.write(html)
+            os.replace(blob_path + ".tmp", blob_path)
+
+        entry = {"url": url, "fetched": time.time(), "sha": sha, "final": final}
+        with open(self.index_path, 'a') as f:
+            f.write(json.dumps(entry) + "\n")
+        self.index[url] = entry
+
+    def has(self, url, ttl=None):  # Top Level
+        """
+        True if the url is cached, and either final or fetched less than ttl seconds ago (ttl=None never expires)
+        """
+        entry = self.index.get(url)
+        if entry is None:
+            return False
+        return entry['final'] or (ttl is None) or (time.time() - entry['fetched'] < ttl)
+
+    def get(self, url, ttl=None):  # Top Level
+        """
+        returns the url's cached HTML, or None if it's not cached or expired
+        """
+        if not self.has(url, ttl):
+            return None
+        with gzip.open(self._blob_path(self.index[url]['sha']), 'rt', encoding='utf-8') as f:
+            return f.read()
+
+
+class Cached_Page_Source(Page_Source_Parent):
+    def __init__(self, cache, page_source=None, ttl=60 * 60, is_final=final_game_page):
+        """
+        page source that checks the cache before asking page_source
+        - page_source=None is offline, only cached pages are returned (expired ones included)
+        - pages is_final(link, html) says are final never expire, other pages are fetched again after ttl seconds
+        """
+        self.cache = cache
+        self.page_source = page_source
+        self.ttl = ttl if page_source is not None else None
+        self.is_final = is_final
+        self.batch_size = page_source.batch_size if page_source is not None else 1000
+
+    def get_htmls(self, links):  # Top Level
+        htmls = [self.cache.get(link, self.ttl) for link in links]
+        missing = [i for i, html in enumerate(htmls) if html is None]
+        if self.page_source is None:
+            for i in missing:
+                htmls[i] = KeyError(f"{links[i]} is not in the cache")
+            return htmls
+
+        fetched_htmls = self.page_source.get_htmls([links[i] for i in missing])
+        for i, html in zip(missing, fetched_htmls):
+            if not isinstance(html, Exception):
+                self.cache.put(links[i], html, self.is_final(links[i], html))
+            htmls[i] = html
+        return htmls
@@ -0,0 +1,130 @@
+# ==============================================================================
+# File: page_sources.py
+# Project: allison
+# File Created: Sunday, 18th October 2026 7:03:51 pm
+# Author: Dillon Koch
+# -----
+# Last Modified: Sunday, 18th October 2026 7:03:51 pm
+# Modified By: Dillon Koch
+# -----
+#
+# -----
+# interchangeable ways for the ESPN scrapers to get pages: selenium, plain HTTP, or saved HTML on disk
+# ==============================================================================
+
+
+import os
+import re
+import sys
+import time
+from os.path import abspath, dirname
+
+from bs4 import BeautifulSoup as soup
+
+ROOT_PATH = dirname(dirname(abspath(__file__)))
+if ROOT_PATH not in sys.path:
+    sys.path.append(ROOT_PATH)
+
+
+from Data_Collection.async_fetcher import Async_Fetcher
+
+
+class Page_Source_Parent:
+    """
+    every page source implements get_htmls(links), and sets batch_size, how many links scrapers should ask for at once
+    """
+    batch_size = 1
+
+    def get_htmls(self, links):  # Top Level
+        """
+        returns each link's HTML, or its exception if it couldn't be fetched
+        """
+        raise NotImplementedError
+
+    def get_sps(self, links):  # Run
+        """
+        returns each link's BeautifulSoup object, or its exception if it couldn't be fetched
+        """
+        return [html if isinstance(html, Exception) else soup(html, 'html.parser') for html in self.get_htmls(links)]
+
+    def get_sp1(self, link):  # Run
+        """
+        returns one link's BeautifulSoup object, raising if it couldn't be fetched
+        """
+        sp = self.get_sps([link])[0]
+        if isinstance(sp, Exception):
+            raise sp
+        return sp
+
+
+class Selenium_Page_Source(Page_Source_Parent):
+    def __init__(self, delay=5):
+        """
+        renders each page in firefox, one at a time with a delay before each (the original scraping path)
+        """
+        self.delay = delay
+        self.batch_size = 1
+        self.start_selenium()
+
+    def start_selenium(self):  # Top Level
+        """
+        fires up the selenium window to start scraping
+        """
+        # * imported here so the HTTP and replay sources work without selenium installed
+        from selenium import webdriver
+        self.driver = webdriver.Firefox(executable_path=ROOT_PATH + "/Data_Collection/geckodriver")
+        time.sleep(1)
+
+    def get_htmls(self, links):  # Top Level
+        htmls = []
+        for link in links:
+            try:
+                time.sleep(self.delay)
+                self.driver.get(link)
+                htmls.append(self.driver.page_source)
+            except Exception as e:
+                htmls.append(e)
+        return htmls
+
+
+class HTTP_Page_Source(Page_Source_Parent):
+    def __init__(self, fetcher=None, batch_size=50):
+        """
+        fetches the raw HTML without a browser, batch_size pages at a time
+        - fetcher is an Async_Fetcher, one with the default rate limits is made if not given
+        """
+        self.fetcher = fetcher or Async_Fetcher()
+        self.batch_size = batch_size
+
+    def get_htmls(self, links):  # Top Level
+        return self.fetcher.fetch_all(links)
+
+
+class Replay_Page_Source(Page_Source_Parent):
+    def __init__(self, folder, batch_size=1000):
+        """
+        reads pages saved to 'folder' by save_page, for offline tests and benchmarks
+        """
+        self.folder = folder
+        self.batch_size = batch_size
+
+    def page_path(self, link):  # Global Helper
+        """
+        file name for the link, e.g. www.espn.com_nba_game___gameId_401360000.html
+        """
+        return os.path.join(self.folder, re.sub(r"[^A-Za-z0-9.-]", "_", link.split("://")[-1]) + ".html")
+
+    def save_page(self, link, html):  # Top Level
+        os.makedirs(self.folder, exist_ok=True)
+        with open(self.page_path(link), 'w', encoding='utf-8') as f:
+            f.write(html)
+
+    def get_htmls(self, links):  # Top Level
+        htmls = []
+        for link in links:
+            try:
+                with open(self.page_path(link), 'r', encoding='utf-8') as f:
+                    htmls.append(f.read())
+            except OSError as e:
+                htmls.append(e)
+        return htmls
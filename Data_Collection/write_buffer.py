@@ -0,0 +1,110 @@
+# ==============================================================================
+# File: write_buffer.py
+# Project: allison
+# File Created: Sunday, 18th October 2026 8:36:14 pm
+# Author: Dillon Koch
+# -----
+# Last Modified: Sunday, 18th October 2026 8:36:14 pm
+# Modified By: Dillon Koch
+# -----
+#
+# -----
+# write-behind saving for csv's the scrapers update one row at a time, with a journal for crash recovery
+# ==============================================================================
+
+
+import json
+import os
+import sys
+import time
+from os.path import abspath, dirname
+
+ROOT_PATH = dirname(dirname(abspath(__file__)))
+if ROOT_PATH not in sys.path:
+    sys.path.append(ROOT_PATH)
+
+
+def _json_default(val):  # Global Helper
+    """
+    numpy scalars to python values, anything else to a string
+    """
+    return val.item() if hasattr(val, 'item') else str(val)
+
+
+class Write_Behind_Csv:
+    def __init__(self, path, key_col, sort_col=None, flush_every=50, flush_seconds=60):
+        """
+        - rows are journaled to {path}.journal as they're scraped, and the csv is rewritten every
+          flush_every rows or flush_seconds seconds, whichever comes first
+        - key_col identifies a row's position in the csv when the journal is replayed after a crash
+        """
+        self.path = path
+        self.journal_path = path + ".journal"
+        self.key_col = key_col
+        self.sort_col = sort_col
+        self.flush_every = flush_every
+        self.flush_seconds = flush_seconds
+        self.num_pending = 0
+        self.last_flush = time.time()
+
+    def replay(self, df):  # Top Level
+        """
+        applying rows left in the journal by an interrupted run, then saving them to the csv
+        - a partly written last line (crash mid-write) is skipped
+        - a journal with no complete rows is cleared, so the next row isn't appended onto a partial line
+        """
+        if not os.path.exists(self.journal_path):
+            return df
+
+        row_dicts = []
+        with open(self.journal_path, 'r') as f:
+            for line in f:
+                try:
+                    row_dicts.append(json.loads(line))
+                except ValueError:
+                    continue
+        if len(row_dicts) == 0:
+            open(self.journal_path, 'w').close()
+            return df
+
+        df = df.astype(object)
+        key_idx = {str(key): i for i, key in df[self.key_col].items()}
+        for row_dict in row_dicts:
+            i = key_idx.get(str(row_dict[self.key_col]))
+            if i is None:
+                print(f"{self.key_col} {row_dict[self.key_col]} from the journal is not in {self.path}")
+                continue
+            df.loc[i, list(row_dict)] = list(row_dict.values())
+        print(f"replayed {len(row_dicts)} journaled rows")
+        return self.flush(df)
+
+    def journal(self, row_dict):  # Top Level
+        """
+        appending a scraped row to the journal, synced to disk so it survives a crash
+        """
+        with open(self.journal_path, 'a') as f:
+            f.write(json.dumps(row_dict, default=_json_default) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        self.num_pending += 1
+
+    def due(self):  # Top Level
+        """
+        True if enough rows or time have built up since the last flush
+        """
+        return (self.num_pending >= self.flush_every) or (time.time() - self.last_flush >= self.flush_seconds)
+
+    def flush(self, df):  # Top Level
+        """
+        sorting and writing the whole df to a temp file, renaming it over the csv, then clearing the journal
+        - the rename is atomic, so the csv is never half written
+        """
+        if self.sort_col is not None:
+            df = df.sort_values(by=[self.sort_col])
+        df.to_csv(self.path + ".tmp", index=False)
+        os.replace(self.path + ".tmp", self.path)
+        open(self.journal_path, 'w').close()
+
+        self.num_pending = 0
+        self.last_flush = time.time()
+        return df
@@ -13,8 +13,6 @@
 # ==============================================================================
 
 
-import copy
-import datetime
 import os
 import sys
 from os.path import abspath, dirname
@@ -22,7 +20,6 @@ from os.path import abspath, dirname
 import numpy as np
 import pandas as pd
 import torch
-from tqdm import tqdm
 
 ROOT_PATH = dirname(dirname(abspath(__file__)))
 if ROOT_PATH not in sys.path:
@@ -32,9 +29,17 @@ from Modeling.run_models import Run_Models
 
 
 class Alt_Odds(Run_Models):
-    def __init__(self, league, bet_type):
-        super(Alt_Odds, self).__init__(league, bet_type)
+    def __init__(self, league, bet_type, block_games=None, registry=None):
+        """
+        - block_games streams the expanded alt odds through the models that many games at a time (all at once if None)
+        """
+        super(Alt_Odds, self).__init__(league, bet_type, registry)
         self.odd_val = "Home_Line_Close" if bet_type == "Spread" else "OU_Close"
+        self.game_cols = ['Date', 'Home', 'Away', 'Bet_Value']
+        self.block_games = block_games
+
+        # * alternate odds are the true odds value plus these offsets
+        self.alt_offsets = [-5, -4, -3, -2.5, -2, -1.5, -1, -0.5, 0, 0.5, 1, 1.5, 2, 2.5, 3, 4, 5]
 
     def load_alt_df(self):  # Top Level
         """
@@ -48,52 +53,59 @@ class Alt_Odds(Run_Models):
             df = pd.read_csv(path)
         return df
 
-    def _alt_odds(self, odds_val):   # Helping Helper _expand_df_alt_odds
+    def _alt_odds_grid(self, odds_vals):   # Helping Helper _expand_alt_odds
         """
-        making a list of alternate odds to make predictions on
-        - includes odds near the true odds value, and 0 (to predict the moneyline)
+        making a (games x lines) array of odds values to make predictions on, and a mask of the lines to use
+        - each game gets its true odds value, then alternate odds near it, then 0 (to predict the moneyline)
+        - 0 is only used for spreads that don't already have it in their alternate odds
         """
-        alt_odds = [odds_val - 5, odds_val - 4, odds_val - 3, odds_val - 2.5,
-                    odds_val - 2, odds_val - 1.5, odds_val - 1, odds_val - 0.5,
-                    odds_val, odds_val + 0.5, odds_val + 1, odds_val + 1.5,
-                    odds_val + 2, odds_val + 2.5, odds_val + 3, odds_val + 4, odds_val + 5]
-        if (0 not in alt_odds) and (self.bet_type == 'Spread'):
-            alt_odds.append(0)
-        return alt_odds
+        alt_odds = odds_vals[:, None] + np.array(self.alt_offsets)
+        lines = np.hstack([odds_vals[:, None], alt_odds, np.zeros((len(odds_vals), 1))])
+        mask = np.ones(lines.shape, dtype=bool)
+        mask[:, -1] = (self.bet_type == 'Spread') & ~(alt_odds == 0).any(axis=1)
+        return lines, mask
 
-    def _expand_df_alt_odds(self, df):  # Specific Helper upcoming_games
+    def _expand_alt_odds(self, df, X_cols):  # Specific Helper upcoming_game_blocks
+        """
+        expanding the games with alternate odds values
+        - X is built as a (games x lines x features) array, then flattened to the used lines in game order
+        - the returned df only has the columns needed to label the predictions
         """
-        expanding the dataframe with alternate odds values
+        lines, mask = self._alt_odds_grid(df[self.odd_val].to_numpy(dtype=float))
+        X = np.repeat(df[X_cols].to_numpy(dtype=float)[:, None, :], lines.shape[1], axis=1)
+        X[:, :, X_cols.index(self.odd_val)] = lines
+        X = X[mask]
+
+        game_idxs = np.repeat(np.arange(len(df)), lines.shape[1]).reshape(lines.shape)[mask]
+        label_cols = list(dict.fromkeys(['Date', 'Home', 'Away', self.bet_val_dict[self.bet_type], self.bet_val_ml_dict[self.bet_type]]))
+        exp_df = df[label_cols].iloc[game_idxs].reset_index(drop=True)
+        exp_df[self.odd_val] = lines[mask]
+        return exp_df, X
+
+    def upcoming_game_blocks(self, df, scaler):  # Top Level
         """
-        exp_df = pd.DataFrame(columns=list(df.columns))
-        for i in tqdm(range(len(df))):
-            exp_df.loc[len(exp_df)] = df.loc[i]
-            odds_val = df.loc[i, self.odd_val]
-            alt_odds = self._alt_odds(odds_val)
-            for alt_odd in alt_odds:
-                new_row = copy.deepcopy(df.loc[i])
-                new_row[self.odd_val] = alt_odd
-                exp_df.loc[len(exp_df)] = new_row
-        return exp_df
+        yielding (df, X) blocks of upcoming games expanded with alternate odds
+        - blocks have block_games games each, so memory stays bounded when the alternate odds grid gets wider
+        """
+        df = self._upcoming_df(df)
+        X_cols = self._X_cols(df)
+        block_games = self.block_games or max(len(df), 1)
+        for start in range(0, len(df), block_games):
+            exp_df, X = self._expand_alt_odds(df.iloc[start:start + block_games], X_cols)
+            X = scaler.transform(X)
+            X = torch.from_numpy(X).float().to(self.device)
+            yield exp_df, X
 
     def upcoming_games(self, df, scaler):  # Top Level
         """
-        locating upcoming games from the dataframe
+        locating upcoming games from the dataframe and expanding them with alternate odds
         - no need to re-predict games from the past
         """
-        df['Date'] = pd.to_datetime(df['Date'])
-        yesterday = datetime.datetime.today() - datetime.timedelta(days=1)
-        yesterday = datetime.datetime(year=2022, month=4, day=15)
-        df = df.loc[df['Date'] > yesterday]
-        odds_cols = ['Home_Line_Close', 'Home_Line_Close_ML', 'OU_Close', 'OU_Close_ML', 'Home_ML', 'Away_ML']
-        df = df.dropna(subset=odds_cols, axis=0)
-        df.reset_index(drop=True, inplace=True)
-        df = self._expand_df_alt_odds(df)
-        X_cols = [col for col in list(df.columns) if col not in (['Home', 'Away', "Date"] + self.all_target_cols)]
-        X = np.array(df[X_cols])
+        df = self._upcoming_df(df)
+        exp_df, X = self._expand_alt_odds(df, self._X_cols(df))
         X = scaler.transform(X)
-        X = torch.from_numpy(X).float().to('cuda')
-        return df, X
+        X = torch.from_numpy(X).float().to(self.device)
+        return exp_df, X
 
     def _game_lists(self, pred_lists):  # Specific Helper update_alt_df
         """
@@ -118,36 +130,23 @@ class Alt_Odds(Run_Models):
         """
         making updates to the df of alternate bets
         """
-        game_lists = self._game_lists(pred_lists)
-        for game_list in game_lists:
-            avg_pred = sum([i[-1].item() for i in game_list]) / len(game_list)
-            new_row = game_list[0][:-1] + [round(avg_pred, 3), "Not Labeled", self._current_ts()]
-            alt_df.loc[len(alt_df)] = new_row
-
+        alt_df = self._add_game_list_rows(alt_df, pred_lists)
         alt_df.drop_duplicates(subset=['Date', 'Home', 'Away', 'Bet_Type', 'Bet_Value', 'Bet_ML'], keep="last", inplace=True)
         alt_df.to_csv(ROOT_PATH + f"/Data/Predictions/{self.league}/Alt_Predictions.csv", index=False)
         print("SAVED")
 
-    def run(self):  # Run
+    def run(self, batched=True):  # Run
         models, model_paths = self.load_models()
         scalers = self.load_scalers(model_paths)
         alt_df = self.load_alt_df()
 
-        pred_lists = []
-        for model, model_path, scaler in tqdm(zip(models, model_paths, scalers)):
-            modeling_df = self.modeling_df_dict[int(model_path.split('_')[-7])]
-            modeling_df, X = self.upcoming_games(modeling_df, scaler)
-            for i in range(len(modeling_df)):
-                pred = model(X[i])
-                date = str(modeling_df.iloc[i]['Date']).split(" ")[0]
-                home = modeling_df.iloc[i]['Home']
-                away = modeling_df.iloc[i]['Away']
-                bet_value = modeling_df.iloc[i][self.bet_val_dict[self.bet_type]]
-                bet_ml = modeling_df.iloc[i][self.bet_val_ml_dict[self.bet_type]]
-                pred_list = [date, home, away, self.bet_type, bet_value, bet_ml, pred]
-                pred_lists.append(pred_list)
-
-        alt_df = self.update_alt_df(alt_df, pred_lists)
+        if not batched:
+            pred_lists = self.row_pred_lists(models, model_paths, scalers)
+            self.update_alt_df(alt_df, pred_lists)
+            return
+
+        game_pred_df = self.batched_game_preds(models, model_paths, scalers)
+        self.save_pred_df(alt_df, game_pred_df, "Alt_Predictions.csv", ['Date', 'Home', 'Away', 'Bet_Type', 'Bet_Value', 'Bet_ML'])
 
 
 if __name__ == '__main__':
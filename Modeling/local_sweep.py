@@ -0,0 +1,164 @@
+# ==============================================================================
+# File: local_sweep.py
+# Project: allison
+# File Created: Sunday, 18th October 2026 4:05:22 pm
+# Author: Dillon Koch
+# -----
+# Last Modified: Sunday, 18th October 2026 4:05:22 pm
+# Modified By: Dillon Koch
+# -----
+#
+# -----
+# running hyperparameter sweeps locally in parallel processes, pruning bad trials early
+# ==============================================================================
+
+
+import multiprocessing
+import os
+import random
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from os.path import abspath, dirname
+
+import pandas as pd
+import torch
+import yaml
+
+ROOT_PATH = dirname(dirname(abspath(__file__)))
+if ROOT_PATH not in sys.path:
+    sys.path.append(ROOT_PATH)
+
+
+from train_models import TrainNetwork
+
+
+class Rung_Pruner:
+    def __init__(self, rung_losses, lock, min_epochs, reduction_factor, max_epochs):
+        """
+        asynchronous successive halving - at each rung epoch a trial keeps going only if
+        its val loss is in the best 1/reduction_factor of all losses reported at that rung so far
+        - rung_losses and lock are Manager proxies shared by every worker
+        """
+        self.rung_losses = rung_losses
+        self.lock = lock
+        self.reduction_factor = reduction_factor
+        self.rungs = []
+        rung = min_epochs
+        while rung < max_epochs:
+            self.rungs.append(rung)
+            rung *= reduction_factor
+
+    def __call__(self, epoch, loss):  # Run
+        """
+        returns True if the trial should be pruned after this epoch
+        """
+        if epoch not in self.rungs:
+            return False
+
+        with self.lock:
+            self.rung_losses.append((epoch, loss))
+            losses = sorted(rung_loss for rung, rung_loss in list(self.rung_losses) if rung == epoch)
+
+        # * not enough trials have reached this rung to compare against yet
+        if len(losses) < self.reduction_factor:
+            return False
+        num_promoted = len(losses) // self.reduction_factor
+        return loss > losses[num_promoted - 1]
+
+
+def _run_trial(trial):  # Global Helper
+    """
+    training one hyperparameter setting in a sweep worker process
+    """
+    torch.set_num_threads(trial['threads'])
+    trainer = TrainNetwork(trial['league'], trial['bet_type'], trial['avg_past_games'], trial['batch_size'], trial['epochs'],
+                           trial['learning_rate'], trial['momentum'], trial['network_idx'], trial['optimizer'],
+                           seed=trial['seed'], print_batches=False)
+
+    epochs_run = []
+    pruned = []
+
+    def epoch_callback(epoch, loss):
+        epochs_run.append(epoch)
+        if trial['pruner'](epoch, loss):
+            pruned.append(epoch)
+        return len(pruned) > 0
+
+    min_loss = trainer.train(val=True, early_stopping=trial['early_stopping'], sweep_csv=True, epoch_callback=epoch_callback)
+    return {**{key: trial[key] for key in trial['param_names']}, "loss": min_loss, "epochs_run": len(epochs_run), "pruned": len(pruned) > 0}
+
+
+class Local_Sweep:
+    def __init__(self, league, bet_type, workers=None, threads_per_worker=1, epochs=100, min_epochs=5, reduction_factor=3,
+                 early_stopping=30, seed=0):
+        """
+        - workers defaults to the number of CPUs / threads_per_worker
+        - seed picks the hyperparameters and the train/val/test split, so every trial is scored on the same val set
+        """
+        self.league = league
+        self.bet_type = bet_type
+        self.threads_per_worker = threads_per_worker
+        self.workers = workers or max(1, (os.cpu_count() or 1) // threads_per_worker)
+        self.epochs = epochs
+        self.min_epochs = min_epochs
+        self.reduction_factor = reduction_factor
+        self.early_stopping = early_stopping
+        self.seed = seed
+        self.sweep_config = self.load_sweep_config()
+
+    def load_sweep_config(self):  # Top Level
+        """
+        loading the hyperparameter ranges from sweep.yaml
+        """
+        with open(ROOT_PATH + "/Modeling/sweep.yaml", 'r') as f:
+            return yaml.safe_load(f)
+
+    def sample_params(self, n_trials):  # Top Level
+        """
+        randomly sampling n_trials hyperparameter settings from the sweep config
+        - 'values' are chosen from, 'min'/'max' are sampled uniformly
+        """
+        rng = random.Random(self.seed)
+        param_list = []
+        for _ in range(n_trials):
+            params = {}
+            for name, param_range in self.sweep_config['parameters'].items():
+                if 'values' in param_range:
+                    params[name] = rng.choice(param_range['values'])
+                else:
+                    params[name] = rng.uniform(param_range['min'], param_range['max'])
+            param_list.append(params)
+        return param_list
+
+    def _trials(self, param_list, pruner):  # Specific Helper run
+        """
+        adding the sweep settings each worker needs to the hyperparameters
+        """
+        shared = {"league": self.league, "bet_type": self.bet_type, "epochs": self.epochs, "seed": self.seed,
+                  "threads": self.threads_per_worker, "early_stopping": self.early_stopping, "pruner": pruner}
+        return [{**shared, **params, "param_names": list(params)} for params in param_list]
+
+    def run(self, n_trials=50):  # Run
+        """
+        running n_trials sampled settings across the worker processes
+        - every trial is appended to /Modeling/Sweeps/{league}_{bet_type}_sweep.csv, pruned ones included
+        """
+        param_list = self.sample_params(n_trials)
+        context = multiprocessing.get_context("spawn")
+        with context.Manager() as manager:
+            pruner = Rung_Pruner(manager.list(), manager.Lock(), self.min_epochs, self.reduction_factor, self.epochs)
+            with ProcessPoolExecutor(max_workers=self.workers, mp_context=context) as executor:
+                results = list(executor.map(_run_trial, self._trials(param_list, pruner)))
+
+        df = pd.DataFrame(results).sort_values(by='loss')
+        print(f"{len(df)} trials, {df['pruned'].sum()} pruned")
+        print(df.head(10).to_string(index=False))
+        return df
+
+
+if __name__ == '__main__':
+    league = "NBA"
+    bet_type = "Total"
+    x = Local_Sweep(league, bet_type)
+    self = x
+    x.run()
@@ -0,0 +1,119 @@
+# ==============================================================================
+# File: model_registry.py
+# Project: allison
+# File Created: Sunday, 18th October 2026 2:14:05 pm
+# Author: Dillon Koch
+# -----
+# Last Modified: Sunday, 18th October 2026 2:14:05 pm
+# Modified By: Dillon Koch
+# -----
+#
+# -----
+# loading modeling frames, scalers and models once per league, shared by run_models.py and alt_odds.py
+# ==============================================================================
+
+
+import os
+import pickle
+import sys
+import time
+from os.path import abspath, dirname
+
+import pandas as pd
+import torch
+
+ROOT_PATH = dirname(dirname(abspath(__file__)))
+if ROOT_PATH not in sys.path:
+    sys.path.append(ROOT_PATH)
+
+
+from train_models import (NeuralNet1, NeuralNet2, NeuralNet3, NeuralNet4,
+                          NeuralNet5, NeuralNet6)
+
+
+def listdir_fullpath(d):
+    return [os.path.join(d, f) for f in os.listdir(d)]
+
+
+class Model_Registry:
+    def __init__(self, league):
+        self.league = league
+        self.device = 'cuda' if torch.cuda.is_available() else 'cpu'
+        self.neural_net_dict = {1: NeuralNet1, 2: NeuralNet2, 3: NeuralNet3, 4: NeuralNet4, 5: NeuralNet5, 6: NeuralNet6}
+        self.apgs = [3, 5, 10, 15, 20, 25]
+
+        # * seconds spent in each loading stage, printed by timing_report()
+        self.stage_times = {}
+        self.modeling_df_dict = self.timed("modeling dfs", self.load_modeling_dfs)
+        self.scaler_dict = self.timed("scalers", self.load_scaler_dict)
+        self.bet_type_models = {}
+
+    def timed(self, stage, func, *args):  # Global Helper
+        """
+        running func(*args) and adding its time to stage_times[stage]
+        """
+        start = time.time()
+        output = func(*args)
+        self.stage_times[stage] = self.stage_times.get(stage, 0) + (time.time() - start)
+        return output
+
+    def load_modeling_dfs(self):  # Top Level __init__
+        """
+        loading the player stats modeling df for each avg past games value
+        """
+        modeling_df_dict = {}
+        for apg in self.apgs:
+            path = ROOT_PATH + f"/Data/Modeling_Data/{self.league}/player_stats_avg_{apg}_past_games.csv"
+            modeling_df_dict[apg] = pd.read_csv(path)
+        return modeling_df_dict
+
+    def load_scaler_dict(self):  # Top Level __init__
+        """
+        loading scalers used to create modeling_df to scale data the exact same way
+        """
+        scaler_folder = ROOT_PATH + f"/Modeling/scalers/{self.league}/"
+        scaler_paths = sorted(listdir_fullpath(scaler_folder))
+        scaler_dict = {}
+        for apg, scaler_path in zip(self.apgs, scaler_paths):
+            with open(scaler_path, 'rb') as f:
+                scaler = pickle.load(f)
+            scaler_dict[apg] = scaler
+        return scaler_dict
+
+    def _load_models(self, bet_type):  # Specific Helper models
+        """
+        loading the bet type's models and their paths from /Models/
+        """
+        folder = ROOT_PATH + f"/Models/{self.league}/"
+        model_paths = [item for item in listdir_fullpath(folder) if bet_type in item]
+        models = []
+        for model_path in model_paths:
+            network_num = int(model_path.split('network')[1][0]) + 1
+            model = self.neural_net_dict[network_num]().to(self.device)
+            model.load_state_dict(torch.load(model_path, map_location=self.device))
+            model.eval()
+            models.append(model)
+        return models, model_paths
+
+    def models(self, bet_type):  # Top Level
+        """
+        returns (models, model_paths) for the bet type, loading them the first time they're needed
+        """
+        if bet_type not in self.bet_type_models:
+            self.bet_type_models[bet_type] = self.timed(f"{bet_type} models", self._load_models, bet_type)
+        return self.bet_type_models[bet_type]
+
+    def scalers(self, model_paths):  # Top Level
+        """
+        returns the scaler used for each model's avg past games value
+        """
+        return [self.scaler_dict[int(model_path.split('_')[-7])] for model_path in model_paths]
+
+    def timing_report(self):  # Run
+        """
+        printing the seconds spent in each stage
+        """
+        print(f"{self.league} timing:")
+        for stage, seconds in self.stage_times.items():
+            print(f"  {stage}: {seconds:.2f}s")
+        print(f"  total: {sum(self.stage_times.values()):.2f}s")
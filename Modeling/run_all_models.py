@@ -0,0 +1,57 @@
+# ==============================================================================
+# File: run_all_models.py
+# Project: allison
+# File Created: Sunday, 18th October 2026 2:31:40 pm
+# Author: Dillon Koch
+# -----
+# Last Modified: Sunday, 18th October 2026 2:31:40 pm
+# Modified By: Dillon Koch
+# -----
+#
+# -----
+# running standard and alternate odds predictions for every bet type in one process
+# ==============================================================================
+
+
+import sys
+from os.path import abspath, dirname
+
+ROOT_PATH = dirname(dirname(abspath(__file__)))
+if ROOT_PATH not in sys.path:
+    sys.path.append(ROOT_PATH)
+
+
+from alt_odds import Alt_Odds
+from model_registry import Model_Registry
+from run_models import Run_Models
+
+
+class Run_All_Models:
+    def __init__(self, league, bet_types=("Spread", "Total"), block_games=None):
+        """
+        - Moneyline isn't included, Run_Models has no bet value column for it yet
+        - block_games is passed to Alt_Odds to stream the alternate odds in blocks
+        """
+        self.league = league
+        self.bet_types = bet_types
+        self.block_games = block_games
+
+    def run(self):  # Run
+        registry = Model_Registry(self.league)
+        for bet_type in self.bet_types:
+            registry.models(bet_type)  # * loading here so model loading isn't counted in the prediction times
+            run_models = Run_Models(self.league, bet_type, registry=registry)
+            registry.timed(f"{bet_type} predictions", run_models.run)
+
+            alt_odds = Alt_Odds(self.league, bet_type, block_games=self.block_games, registry=registry)
+            registry.timed(f"{bet_type} alt predictions", alt_odds.run)
+
+        registry.timing_report()
+        return registry
+
+
+if __name__ == '__main__':
+    league = "NBA"
+    x = Run_All_Models(league)
+    self = x
+    x.run()
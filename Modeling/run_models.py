@@ -14,8 +14,8 @@
 
 import datetime
 import os
-import pickle
 import sys
+import time
 from os.path import abspath, dirname
 
 import numpy as np
@@ -28,21 +28,20 @@ if ROOT_PATH not in sys.path:
     sys.path.append(ROOT_PATH)
 
 
-from train_models import (NeuralNet1, NeuralNet2, NeuralNet3, NeuralNet4,
-                          NeuralNet5, NeuralNet6)
-
-
-def listdir_fullpath(d):
-    return [os.path.join(d, f) for f in os.listdir(d)]
+from model_registry import Model_Registry
 
 
 class Run_Models:
-    def __init__(self, league, bet_type):
+    def __init__(self, league, bet_type, registry=None):
+        """
+        - registry is a Model_Registry shared across bet types, a new one is loaded if None
+        """
         self.league = league
         self.bet_type = bet_type
 
-        self.neural_net_dict = {1: NeuralNet1, 2: NeuralNet2, 3: NeuralNet3, 4: NeuralNet4, 5: NeuralNet5, 6: NeuralNet6}
-        self.modeling_df_dict = {i: self.load_modeling_df(i) for i in [3, 5, 10, 15, 20, 25]}
+        self.registry = registry if registry is not None else Model_Registry(league)
+        self.device = self.registry.device
+        self.modeling_df_dict = self.registry.modeling_df_dict
 
         # * identifying target column
         self.bet_type_to_target_col = {"Spread": "Home_Covered", "Moneyline": "Home_Win",
@@ -54,46 +53,23 @@ class Run_Models:
         self.bet_val_dict = {"Spread": "Home_Line_Close", "Total": "OU_Close"}
         self.bet_val_ml_dict = {"Spread": "Home_Line_Close_ML", "Total": "OU_Close_ML"}
 
+        # * columns identifying one game's prediction, averaged across models
+        self.game_cols = ['Date', 'Home', 'Away']
+
     def _current_ts(self):  # Global Helper
         return datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
 
-    def load_modeling_df(self, idx):  # Top Level __init__
-        path = ROOT_PATH + f"/Data/Modeling_Data/{self.league}/player_stats_avg_{idx}_past_games.csv"
-        df = pd.read_csv(path)
-        return df
-
     def load_models(self):  # Top Level
         """
-        loading models and their paths from /Models/
+        loading models and their paths from /Models/ (once per registry)
         """
-        folder = ROOT_PATH + f"/Models/{self.league}/"
-        model_paths = [item for item in listdir_fullpath(folder) if self.bet_type in item]
-        models = []
-        for model_path in model_paths:
-            network_num = int(model_path.split('network')[1][0]) + 1
-            model = self.neural_net_dict[network_num]().to('cuda')
-            model.load_state_dict(torch.load(model_path))
-            models.append(model)
-        return models, model_paths
+        return self.registry.models(self.bet_type)
 
     def load_scalers(self, model_paths):  # Top Level
         """
         loading scalers used to create modeling_df to scale data the exact same way
         """
-        scaler_folder = ROOT_PATH + f"/Modeling/scalers/{self.league}/"
-        scaler_paths = sorted(listdir_fullpath(scaler_folder))
-        scaler_dict = {}
-        for apg, scaler_path in zip([3, 5, 10, 15, 20, 25], scaler_paths):
-            with open(scaler_path, 'rb') as f:
-                scaler = pickle.load(f)
-            scaler_dict[apg] = scaler
-
-        scalers = []
-        for model_path in model_paths:
-            path_apg = int(model_path.split('_')[-7])
-            scalers.append(scaler_dict[path_apg])
-
-        return scalers
+        return self.registry.scalers(model_paths)
 
     def load_pred_df(self):  # Top Level
         """
@@ -107,9 +83,9 @@ class Run_Models:
             df = pd.read_csv(path)
         return df
 
-    def upcoming_games(self, df, scaler):  # Top Level
+    def _upcoming_df(self, df):  # Specific Helper upcoming_games
         """
-        creating input X vectors for upcoming games
+        locating upcoming games with odds available from the modeling df
         """
         df['Date'] = pd.to_datetime(df['Date'])
         yesterday = datetime.datetime.today() - datetime.timedelta(days=1)
@@ -118,12 +94,31 @@ class Run_Models:
         odds_cols = ['Home_Line_Close', 'Home_Line_Close_ML', 'OU_Close', 'OU_Close_ML', 'Home_ML', 'Away_ML']
         df = df.dropna(subset=odds_cols, axis=0)
         df.reset_index(drop=True, inplace=True)
-        X_cols = [col for col in list(df.columns) if col not in (['Home', 'Away', "Date"] + self.all_target_cols)]
-        X = np.array(df[X_cols])
+        return df
+
+    def _X_cols(self, df):  # Specific Helper upcoming_games
+        """
+        returns the model input columns of the modeling df
+        """
+        return [col for col in list(df.columns) if col not in (['Home', 'Away', "Date"] + self.all_target_cols)]
+
+    def upcoming_games(self, df, scaler):  # Top Level
+        """
+        creating input X vectors for upcoming games
+        """
+        df = self._upcoming_df(df)
+        X = np.array(df[self._X_cols(df)])
         X = scaler.transform(X)
-        X = torch.from_numpy(X).float().to('cuda')
+        X = torch.from_numpy(X).float().to(self.device)
         return df, X
 
+    def upcoming_game_blocks(self, df, scaler):  # Top Level
+        """
+        yielding (df, X) blocks of upcoming games to run the models on
+        - all the games fit in one block here, Alt_Odds splits them up
+        """
+        yield self.upcoming_games(df, scaler)
+
     def _game_lists(self, pred_lists):  # Specific Helper update_pred_df
         """
         making lists of game info - date, home, away, bet_val, ..
@@ -142,31 +137,105 @@ class Run_Models:
                 game_lists.append([pred_list])
         return game_lists
 
-    def update_pred_df(self, pred_df, pred_lists):  # Top Level
+    def _add_game_list_rows(self, pred_df, pred_lists):  # Specific Helper update_pred_df
         """
-        updating the predictions df with the models' outputs
+        adding one row per game to pred_df with the average of its pred_lists
         """
         game_lists = self._game_lists(pred_lists)
         for game_list in game_lists:
             avg_pred = sum([i[-1].item() for i in game_list]) / len(game_list)
             new_row = game_list[0][:-1] + [round(avg_pred, 3), "Not Labeled", self._current_ts()]
             pred_df.loc[len(pred_df)] = new_row
+        return pred_df
 
+    def update_pred_df(self, pred_df, pred_lists):  # Top Level
+        """
+        updating the predictions df with the models' outputs
+        """
+        pred_df = self._add_game_list_rows(pred_df, pred_lists)
         pred_df.drop_duplicates(subset=['Date', 'Home', 'Away', 'Bet_Type'], keep="last", inplace=True)
         pred_df.to_csv(ROOT_PATH + f"/Data/Predictions/{self.league}/Predictions.csv", index=False)
         print("SAVED")
 
-    def run(self):  # Run
-        models, model_paths = self.load_models()
-        scalers = self.load_scalers(model_paths)
-        pred_df = self.load_pred_df()
+    def _predict(self, model, X):  # Specific Helper batched_game_preds
+        """
+        running the model on every row of X in one batch
+        - returns the predictions and the seconds it took
+        """
+        start = time.time()
+        with torch.no_grad():
+            preds = model(X).reshape(-1).cpu().numpy()
+        return preds, time.time() - start
+
+    def _model_pred_df(self, modeling_df, preds):  # Specific Helper batched_game_preds
+        """
+        creating a df of one model's predictions, one row per row of modeling_df
+        """
+        return pd.DataFrame({"Date": pd.to_datetime(modeling_df['Date']).dt.strftime("%Y-%m-%d"),
+                             "Home": modeling_df['Home'],
+                             "Away": modeling_df['Away'],
+                             "Bet_Type": self.bet_type,
+                             "Bet_Value": modeling_df[self.bet_val_dict[self.bet_type]],
+                             "Bet_ML": modeling_df[self.bet_val_ml_dict[self.bet_type]],
+                             "Prediction": preds})
+
+    def _avg_game_preds(self, model_pred_df):  # Specific Helper batched_game_preds
+        """
+        averaging each game's predictions across models
+        - games keep the order they first show up in, bet values/ML come from the first model
+        - predictions are summed in row order with np.add.at, so averages match the _game_lists version exactly
+        """
+        game_codes = model_pred_df.groupby(self.game_cols, sort=False, dropna=False).ngroup().to_numpy()
+        num_games = game_codes.max() + 1 if len(game_codes) > 0 else 0
+        first_idxs = np.unique(game_codes, return_index=True)[1]
+
+        pred_sums = np.zeros(num_games)
+        np.add.at(pred_sums, game_codes, model_pred_df['Prediction'].to_numpy(dtype=float))
+        avg_preds = pred_sums / np.bincount(game_codes, minlength=num_games)
+
+        game_pred_df = model_pred_df.iloc[first_idxs][['Date', 'Home', 'Away', 'Bet_Type', 'Bet_Value', 'Bet_ML']].reset_index(drop=True)
+        game_pred_df['Prediction'] = [round(pred, 3) for pred in avg_preds.tolist()]
+        game_pred_df['Outcome'] = "Not Labeled"
+        game_pred_df['Pred_ts'] = self._current_ts()
+        return game_pred_df
+
+    def batched_game_preds(self, models, model_paths, scalers):  # Top Level
+        """
+        running each model over its upcoming games a block at a time, then averaging predictions per game
+        """
+        model_pred_dfs = []
+        for model, model_path, scaler in zip(models, model_paths, scalers):
+            modeling_df = self.modeling_df_dict[int(model_path.split('_')[-7])]
+            rows = 0
+            seconds = 1e-9
+            for block_df, X in self.upcoming_game_blocks(modeling_df, scaler):
+                preds, block_seconds = self._predict(model, X)
+                model_pred_dfs.append(self._model_pred_df(block_df, preds))
+                rows += len(preds)
+                seconds += block_seconds
+            print(f"{os.path.basename(model_path)}: {rows} rows, {rows / seconds:.0f} rows/sec")
+        return self._avg_game_preds(pd.concat(model_pred_dfs, ignore_index=True))
+
+    def save_pred_df(self, pred_df, game_pred_df, filename, subset):  # Top Level
+        """
+        adding the new game predictions to pred_df and saving it to /Data/Predictions/{league}/{filename}
+        """
+        pred_df = pd.concat([pred_df, game_pred_df], ignore_index=True) if len(pred_df) > 0 else game_pred_df
+        pred_df.drop_duplicates(subset=subset, keep="last", inplace=True)
+        pred_df.to_csv(ROOT_PATH + f"/Data/Predictions/{self.league}/{filename}", index=False)
+        print("SAVED")
 
+    def row_pred_lists(self, models, model_paths, scalers):  # Top Level
+        """
+        running each model one row at a time (original path, used when batched=False)
+        """
         pred_lists = []
         for model, model_path, scaler in tqdm(zip(models, model_paths, scalers)):
             modeling_df = self.modeling_df_dict[int(model_path.split('_')[-7])]
             modeling_df, X = self.upcoming_games(modeling_df, scaler)
             for i in range(len(modeling_df)):
-                pred = model(X[i])
+                with torch.no_grad():
+                    pred = model(X[i])
                 date = str(modeling_df.iloc[i]['Date']).split(" ")[0]
                 home = modeling_df.iloc[i]['Home']
                 away = modeling_df.iloc[i]['Away']
@@ -174,8 +243,52 @@ class Run_Models:
                 bet_ml = modeling_df.iloc[i][self.bet_val_ml_dict[self.bet_type]]
                 pred_list = [date, home, away, self.bet_type, bet_value, bet_ml, pred]
                 pred_lists.append(pred_list)
+        return pred_lists
+
+    def benchmark_avg_game_preds(self, num_games=1230, num_models=10, seed=0):  # Run
+        """
+        timing the _game_lists averaging against _avg_game_preds on a season of synthetic predictions
+        - checks both give the same rows (Pred_ts aside)
+        """
+        rng = np.random.default_rng(seed)
+        dates = [str(datetime.date(2021, 10, 19) + datetime.timedelta(days=int(day))) for day in rng.integers(0, 170, num_games)]
+        homes = [f"Home {i}" for i in range(num_games)]
+        aways = [f"Away {i}" for i in rng.integers(0, 30, num_games)]
+        bet_values = rng.choice(np.arange(-15, 15.5, 0.5), num_games).tolist()
+        preds = rng.random((num_models, num_games), dtype=np.float32)
+
+        pred_lists = [[date, home, away, self.bet_type, bet_value, -110, torch.tensor([pred])]
+                      for model_preds in preds for date, home, away, bet_value, pred in zip(dates, homes, aways, bet_values, model_preds)]
+        model_pred_df = pd.DataFrame({"Date": dates * num_models, "Home": homes * num_models, "Away": aways * num_models,
+                                      "Bet_Type": self.bet_type, "Bet_Value": bet_values * num_models, "Bet_ML": -110,
+                                      "Prediction": preds.reshape(-1)})
+
+        cols = ['Date', 'Home', 'Away', 'Bet_Type', 'Bet_Value', 'Bet_ML', 'Prediction', 'Outcome', "Pred_ts"]
+        start = time.time()
+        game_list_df = self._add_game_list_rows(pd.DataFrame(columns=cols), pred_lists)
+        game_list_time = time.time() - start
+
+        start = time.time()
+        vectorized_df = self._avg_game_preds(model_pred_df)
+        vectorized_time = time.time() - start
+
+        assert game_list_df.drop(columns='Pred_ts').values.tolist() == vectorized_df.drop(columns='Pred_ts').values.tolist()
+        print(f"{num_games} games x {num_models} models")
+        print(f"_game_lists: {game_list_time:.2f}s, vectorized: {vectorized_time:.4f}s ({game_list_time / vectorized_time:.0f}x)")
+        return game_list_time, vectorized_time
+
+    def run(self, batched=True):  # Run
+        models, model_paths = self.load_models()
+        scalers = self.load_scalers(model_paths)
+        pred_df = self.load_pred_df()
+
+        if not batched:
+            pred_lists = self.row_pred_lists(models, model_paths, scalers)
+            self.update_pred_df(pred_df, pred_lists)
+            return
 
-        pred_df = self.update_pred_df(pred_df, pred_lists)
+        game_pred_df = self.batched_game_preds(models, model_paths, scalers)
+        self.save_pred_df(pred_df, game_pred_df, "Predictions.csv", ['Date', 'Home', 'Away', 'Bet_Type'])
 
 
 if __name__ == '__main__':
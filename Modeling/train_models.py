@@ -13,12 +13,16 @@
 # ==============================================================================
 
 
-import copy
 import datetime
+import fcntl
+import math
+import multiprocessing
 import os
 import pickle
-import random
 import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
 from os.path import abspath, dirname
 
 import numpy as np
@@ -39,14 +43,114 @@ def listdir_fullpath(d):
     return [os.path.join(d, f) for f in os.listdir(d)]
 
 
+# * training on the GPU when there is one
+DEVICE = "cuda" if torch.cuda.is_available() else "cpu"
+
+# * (X, y, split_slices, scaler) for each (league, bet_type, player_stats, avg_past_games, splitter key), shared by every SBDataset
+SPLIT_CACHE = {}
+
+# * finished games df for each (league, player_stats, avg_past_games), so new splits don't re-read the csv
+FRAME_CACHE = {}
+
+
+class PastRecentSplit:
+    def __init__(self, seed=None):
+        """
+        - games before 2018 are mostly train, recent games are split more evenly across train/val/test
+        - seed makes the split reproducible, None picks a random split
+        """
+        self.seed = seed
+        self.key = ("past_recent", seed)
+
+    def _split_positions(self, positions, train_pct, val_pct):  # Specific Helper split
+        """
+        splitting shuffled row positions into train/val/test
+        """
+        split1 = int(len(positions) * train_pct)
+        split2 = int(len(positions) * (train_pct + val_pct))
+        return positions[:split1], positions[split1:split2], positions[split2:]
+
+    def split(self, df):  # Run
+        """
+        splitting the df into train/val/test dfs with a date mask and a seeded permutation
+        - each split keeps the rows in their original order
+        """
+        positions = np.arange(len(df))
+        past_mask = df['Date'].dt.year.to_numpy() < 2018
+        rng = np.random.default_rng(self.seed)
+        past_splits = self._split_positions(rng.permutation(positions[past_mask]), train_pct=.9, val_pct=.05)
+        recent_splits = self._split_positions(rng.permutation(positions[~past_mask]), train_pct=.4, val_pct=.3)
+        return [df.iloc[np.sort(np.concatenate([past_positions, recent_positions]))].reset_index(drop=True)
+                for past_positions, recent_positions in zip(past_splits, recent_splits)]
+
+
+class WalkForwardSplit:
+    def __init__(self, n_train_seasons=3, fold=0):
+        """
+        - fold k trains on n_train_seasons seasons starting at the k'th season,
+          validates on the next season and tests on the one after that
+        """
+        self.n_train_seasons = n_train_seasons
+        self.fold = fold
+        self.key = ("walk_forward", n_train_seasons, fold)
+
+    def seasons(self, df):  # Global Helper
+        """
+        returns each game's season (the year it started in, seasons start in August)
+        """
+        years = df['Date'].dt.year.to_numpy()
+        return np.where(df['Date'].dt.month.to_numpy() >= 8, years, years - 1)
+
+    def n_folds(self, df):  # Top Level
+        """
+        returns the number of folds the df has enough seasons for
+        """
+        return max(len(np.unique(self.seasons(df))) - self.n_train_seasons - 1, 0)
+
+    def _fold_dfs(self, df, seasons, unique_seasons, fold):  # Specific Helper split, folds
+        """
+        returns the train/val/test dfs of one fold
+        """
+        train_seasons = unique_seasons[fold:fold + self.n_train_seasons]
+        val_season = unique_seasons[fold + self.n_train_seasons]
+        test_season = unique_seasons[fold + self.n_train_seasons + 1]
+        masks = [np.isin(seasons, train_seasons), seasons == val_season, seasons == test_season]
+        return [df.loc[mask].reset_index(drop=True) for mask in masks]
+
+    def split(self, df):  # Run
+        """
+        splitting the df into the train/val/test dfs of self.fold
+        """
+        seasons = self.seasons(df)
+        unique_seasons = np.unique(seasons)
+        if self.fold >= self.n_folds(df):
+            raise ValueError(f"fold {self.fold} needs {self.fold + self.n_train_seasons + 2} seasons, only found {len(unique_seasons)}")
+        return self._fold_dfs(df, seasons, unique_seasons, self.fold)
+
+    def folds(self, df):  # Run
+        """
+        yielding the train/val/test dfs of every fold, with the seasons computed once
+        """
+        seasons = self.seasons(df)
+        unique_seasons = np.unique(seasons)
+        for fold in range(self.n_folds(df)):
+            yield self._fold_dfs(df, seasons, unique_seasons, fold)
+
+
 class SBDataset(Dataset):
-    def __init__(self, league, train_val_test, bet_type, player_stats, avg_past_games):
+    def __init__(self, league, train_val_test, bet_type, player_stats, avg_past_games, seed=None, splitter=None):
+        """
+        - the train/val/test split and scaler are computed once per cache key, each dataset is a view into them
+        - seed makes the default PastRecentSplit reproducible, None picks a random split once per process
+        - splitter can be any object with a .key and .split(df) -> [train_df, val_df, test_df], like WalkForwardSplit
+        """
         super(SBDataset, self).__init__()
         self.league = league
         self.train_val_test = train_val_test
         self.bet_type = bet_type
         self.player_stats = player_stats
         self.avg_past_games = avg_past_games
+        self.splitter = splitter if splitter is not None else PastRecentSplit(seed)
 
         # * identifying target column
         self.bet_type_to_target_col = {"Spread": "Home_Covered", "Moneyline": "Home_Win",
@@ -55,12 +159,12 @@ class SBDataset(Dataset):
         self.all_target_cols = list(self.bet_type_to_target_col.values())
 
         # * loading X/y data
-        df = self.finished_games()
-        train_df, val_df, test_df = self.train_val_test_split(df)
-        train_df = self.balance_classes(train_df)
-        val_df = self.balance_classes(val_df)
-        test_df = self.balance_classes(test_df)
-        self.X, self.y = self.scaled_xy(train_df, val_df, test_df, train_val_test)
+        cache_key = (league, bet_type, player_stats, avg_past_games, self.splitter.key)
+        if cache_key not in SPLIT_CACHE:
+            SPLIT_CACHE[cache_key] = self.load_split()
+        X, y, split_slices, self.scaler = SPLIT_CACHE[cache_key]
+        self.X = X[split_slices[train_val_test]]
+        self.y = y[split_slices[train_val_test]]
 
     def _load_df(self):  # Specific Helper
         """
@@ -82,63 +186,25 @@ class SBDataset(Dataset):
 
     def finished_games(self):  # Top Level
         """
-        loading the /Data/Modeling_Data/ df of finished games only
+        loading the /Data/Modeling_Data/ df of finished games only (once per process)
         """
+        frame_key = (self.league, self.player_stats, self.avg_past_games)
+        if frame_key in FRAME_CACHE:
+            return FRAME_CACHE[frame_key]
+
         raw_df = self._load_df()
         raw_df['Date'] = pd.to_datetime(raw_df['Date'])
         yesterday = datetime.datetime.today() - datetime.timedelta(days=1)
         finished_df = raw_df.loc[raw_df['Date'] < yesterday]
         finished_df = self._remove_missing_odds_cols(finished_df)
+        FRAME_CACHE[frame_key] = finished_df
         return finished_df
 
-    def _past_recent_split(self, df):  # Specific Helper train_test_split
-        """
-        making lists of indices in the dataframe that belong to "past" and "recent"
-        """
-        past_idx = []
-        recent_idx = []
-        for i, row in df.iterrows():
-            if row['Date'].year < 2018:
-                past_idx.append(i)
-            else:
-                recent_idx.append(i)
-
-        random.shuffle(past_idx)
-        random.shuffle(recent_idx)
-        return past_idx, recent_idx
-
-    def _split_idx_list(self, idx_list, train_pct, val_pct):
-        """
-        splitting a given idx_list into train/val/test lists
-        """
-        split1 = int(len(idx_list) * train_pct)
-        split2 = int(len(idx_list) * (train_pct + val_pct))
-        train_idx = idx_list[:split1]
-        val_idx = idx_list[split1:split2]
-        test_idx = idx_list[split2:]
-        return train_idx, val_idx, test_idx
-
-    def _idx_lists_to_df(self, df, past_idx, recent_idx):  # Specific Helper train_test_split
-        """
-        subsetting the df to only rows in the past_idx or recent_idx lists
-        """
-        all_idx = past_idx + recent_idx
-        df_copy = copy.deepcopy(df)
-        filtered_df = df_copy.loc[df_copy.index.isin(all_idx)]
-        filtered_df.reset_index(inplace=True, drop=True)
-        return filtered_df
-
     def train_val_test_split(self, df):  # Top Level
         """
         splitting the data into train/val/test groups
         """
-        past_idx, recent_idx = self._past_recent_split(df)
-        past_train_idx, past_val_idx, past_test_idx = self._split_idx_list(past_idx, train_pct=.9, val_pct=.05)
-        recent_train_idx, recent_val_idx, recent_test_idx = self._split_idx_list(recent_idx, train_pct=.4, val_pct=.3)
-        train_df = self._idx_lists_to_df(df, past_train_idx, recent_train_idx)
-        val_df = self._idx_lists_to_df(df, past_val_idx, recent_val_idx)
-        test_df = self._idx_lists_to_df(df, past_test_idx, recent_test_idx)
-        return train_df, val_df, test_df
+        return self.splitter.split(df)
 
     def balance_classes(self, df):  # Top Level
         """
@@ -161,42 +227,54 @@ class SBDataset(Dataset):
         balanced_df = pd.concat([positives, negatives])
         return balanced_df
 
-    def _save_scaler(self, scaler):  # Specific Helper scaled_xy
+    def scaled_xy(self, split_dfs):  # Top Level
         """
-        saving the scaler to a pickle file so run_models.py can use the same one
+        scaling the data and stacking train/val/test into one X/y tensor pair
+        - returns X, y, a dict of the slice each split takes up, and the fitted scaler
         """
-        path = ROOT_PATH + f"/Modeling/scalers/{self.league}/avg_{self.avg_past_games}_past_games_scaler.pkl"
-        with open(path, 'wb') as f:
-            pickle.dump(scaler, f)
+        # * fitting the scaler on the train set
+        train_df = split_dfs["train"]
+        X_cols = [col for col in list(train_df.columns) if col not in (['Home', "Away", "Date"] + self.all_target_cols)]
+        scaler = StandardScaler()
+        scaler.fit(np.array(train_df[X_cols]))
 
-    def scaled_xy(self, train_df, val_df, test_df, train_val_test):  # Top Level
+        X_arrs = []
+        y_arrs = []
+        split_slices = {}
+        start = 0
+        for train_val_test, split_df in split_dfs.items():
+            X_arrs.append(scaler.transform(np.array(split_df[X_cols])))
+            y_arrs.append(np.array(split_df[self.target_col]))
+            split_slices[train_val_test] = slice(start, start + len(split_df))
+            start += len(split_df)
+
+        X = torch.from_numpy(np.concatenate(X_arrs)).float().to(DEVICE)
+        y = torch.from_numpy(np.concatenate(y_arrs)).float().to(DEVICE)
+        return X, y, split_slices, scaler
+
+    def load_split(self):  # Top Level
         """
-        scaling the data and separating into X/y tensors
+        loading, splitting, balancing and scaling the data once for train/val/test
         """
-        # * fitting the scaler on the train set regardless of train_data
-        train_y = np.array(train_df[self.target_col])
-        X_cols = [col for col in list(train_df.columns) if col not in (['Home', "Away", "Date"] + self.all_target_cols)]
-        train_X = np.array(train_df[X_cols])
-        scaler = StandardScaler()
-        train_X = scaler.fit_transform(train_X)
-
-        # * choosing X/y based on whether we want train/test data
-        if train_val_test == "train":
-            X = train_X
-            y = train_y
-        elif train_val_test == "val":
-            y = np.array(val_df[self.target_col])
-            X = np.array(val_df[X_cols])
-            X = scaler.transform(X)
-        elif train_val_test == "test":
-            y = np.array(test_df[self.target_col])
-            X = np.array(test_df[X_cols])
-            X = scaler.transform(X)
-
-        X = torch.from_numpy(X).float().to('cuda')
-        y = torch.from_numpy(y).float().to('cuda')
-        self._save_scaler(scaler)
-        return X, y
+        df = self.finished_games()
+        train_df, val_df, test_df = self.train_val_test_split(df)
+        split_dfs = {"train": self.balance_classes(train_df),
+                     "val": self.balance_classes(val_df),
+                     "test": self.balance_classes(test_df)}
+        return self.scaled_xy(split_dfs)
+
+    def save_scaler(self):  # Top Level
+        """
+        saving the split's scaler to a pickle file so run_models.py can use the same one
+        - only called when a model trained on this split is saved, so walk-forward folds and
+          sweep trials never overwrite the scaler the saved models were trained with
+        - written to a temp file and renamed, since parallel train_best_on_test workers can save at the same time
+        """
+        path = ROOT_PATH + f"/Modeling/scalers/{self.league}/avg_{self.avg_past_games}_past_games_scaler.pkl"
+        tmp_path = path + f".{os.getpid()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            pickle.dump(self.scaler, f)
+        os.replace(tmp_path, path)
 
     def __len__(self):  # Run
         """
@@ -211,6 +289,23 @@ class SBDataset(Dataset):
         return self.X[idx], self.y[idx]
 
 
+class SyntheticDataset(Dataset):
+    def __init__(self, n_samples, n_features=542, seed=0):
+        """
+        random X/y data on the device, used to benchmark training without loading a modeling csv
+        """
+        super(SyntheticDataset, self).__init__()
+        generator = torch.Generator().manual_seed(seed)
+        self.X = torch.randn(n_samples, n_features, generator=generator).to(DEVICE)
+        self.y = torch.randint(0, 2, (n_samples,), generator=generator).float().to(DEVICE)
+
+    def __len__(self):  # Run
+        return self.y.shape[0]
+
+    def __getitem__(self, idx):  # Run
+        return self.X[idx], self.y[idx]
+
+
 class NeuralNet1(nn.Module):
     def __init__(self):
         super(NeuralNet1, self).__init__()
@@ -386,7 +481,13 @@ class NeuralNet6(nn.Module):
 
 
 class TrainNetwork:
-    def __init__(self, league, bet_type, avg_past_games, batch_size, epochs, learning_rate, momentum, network_idx, optimizer, wandb_sweep=False, wandb_single=False):
+    def __init__(self, league, bet_type, avg_past_games, batch_size, epochs, learning_rate, momentum, network_idx, optimizer, wandb_sweep=False, wandb_single=False,
+                 seed=None, splitter=None, fast_train=True, print_batches=True, datasets=None):
+        """
+        - fast_train slices mini-batches straight from the on-device tensors instead of using the DataLoaders
+        - print_batches prints the training loss every 100 batches (each print syncs with the device)
+        - datasets can be a (train, val, test) tuple to use instead of loading SBDatasets
+        """
         # * sports betting params
         self.league = league
         self.bet_type = bet_type
@@ -407,19 +508,19 @@ class TrainNetwork:
             wandb.config = {"epochs": self.epochs, "batch_size": self.batch_size, "learning_rate": self.learning_rate, "momentum": self.momentum}
 
         # * train/val/test dataloaders
-        self.train_dataset = SBDataset(league, "train", bet_type, True, avg_past_games)
+        if datasets is None:
+            datasets = [SBDataset(league, train_val_test, bet_type, True, avg_past_games, seed, splitter) for train_val_test in ["train", "val", "test"]]
+        self.train_dataset, self.val_dataset, self.test_dataset = datasets
         self.train_dataloader = DataLoader(self.train_dataset, batch_size=self.batch_size, shuffle=True)
-
-        self.val_dataset = SBDataset(league, "val", bet_type, True, avg_past_games)
         self.val_dataloader = DataLoader(self.val_dataset, batch_size=self.batch_size, shuffle=True)
-
-        self.test_dataset = SBDataset(league, "test", bet_type, True, avg_past_games)
         self.test_dataloader = DataLoader(self.test_dataset, batch_size=self.batch_size, shuffle=True)
+        self.fast_train = fast_train
+        self.print_batches = print_batches
 
         # * model
         self.network_idx = network_idx
         self.models = [NeuralNet1, NeuralNet2, NeuralNet3, NeuralNet4, NeuralNet5, NeuralNet6]
-        self.model = self.models[network_idx]().to("cuda")
+        self.model = self.models[network_idx]().to(DEVICE)
         self.loss = nn.BCELoss()
         self.optimizer_name = optimizer
         self.optimizer = self.get_optimizer(optimizer)
@@ -435,13 +536,33 @@ class TrainNetwork:
         elif opt_name == 'rmsprop':
             return torch.optim.RMSprop(self.model.parameters(), lr=self.learning_rate)
 
+    def _device_batches(self, dataset, shuffle=True):  # Specific Helper train_loop, val_loop, test_loop
+        """
+        yielding contiguous (X, y) mini-batches from a dataset whose tensors are already on the device
+        - shuffling permutes the whole dataset once on the device instead of indexing it sample by sample
+        """
+        X, y = dataset.X, dataset.y
+        if shuffle:
+            perm = torch.randperm(len(y), device=X.device)
+            X, y = X[perm], y[perm]
+        for start in range(0, len(y), self.batch_size):
+            yield X[start:start + self.batch_size], y[start:start + self.batch_size]
+
+    def _batches(self, dataset, dataloader, shuffle=True):  # Specific Helper train_loop, val_loop, test_loop
+        """
+        returns the fast device batches or the dataloader, depending on self.fast_train
+        """
+        return self._device_batches(dataset, shuffle) if self.fast_train else dataloader
+
     def train_loop(self):  # Top Level
         """
         running and updating the neural net on the training data
+        - loss.item() syncs with the device, so it's only called when the loss is logged
         """
         self.model.train()
+        num_batches = math.ceil(len(self.train_dataset) / self.batch_size)
 
-        for batch_idx, (X, y) in enumerate(self.train_dataloader):
+        for batch_idx, (X, y) in enumerate(self._batches(self.train_dataset, self.train_dataloader)):
             self.optimizer.zero_grad()
 
             pred = self.model(X)
@@ -452,29 +573,35 @@ class TrainNetwork:
             if self.wandb:
                 wandb.log({"Training Loss": loss.item()})
 
-            if batch_idx % 100 == 0:
-                print(f"Batch {batch_idx+1}/{len(self.train_dataloader)}: Loss: {loss.item()}")
+            if self.print_batches and batch_idx % 100 == 0:
+                print(f"Batch {batch_idx+1}/{num_batches}: Loss: {loss.item()}")
 
-    def val_loop(self):  # Top Level
+    def _eval_loop(self, dataset, dataloader):  # Specific Helper val_loop, test_loop
         """
-        evaluating the neural net's predictions on the validation set
+        returns the summed batch losses / number of samples, and the accuracy of the model on a dataset
         """
         self.model.eval()
-        val_loss = 0
+        total_loss = 0
         correct = 0
 
         with torch.no_grad():
-            for X, y in self.val_dataloader:
+            for X, y in self._batches(dataset, dataloader, shuffle=False):
                 output = self.model(X)
-                val_loss += self.loss(output, torch.unsqueeze(y, 1))
+                total_loss += self.loss(output, torch.unsqueeze(y, 1))
                 pred = torch.round(output)
-                correct += pred.eq(y.view_as(pred)).sum().item()
+                correct += pred.eq(y.view_as(pred)).sum()
 
-        val_loss /= len(self.val_dataloader.dataset)
+        return total_loss / len(dataset), int(correct) / len(dataset)
+
+    def val_loop(self):  # Top Level
+        """
+        evaluating the neural net's predictions on the validation set
+        """
+        val_loss, val_accuracy = self._eval_loop(self.val_dataset, self.val_dataloader)
 
-        print(f"\nVal set: Average loss: {val_loss:.4f}, Accuracy: {correct / len(self.val_dataloader.dataset):.4f}%")
+        print(f"\nVal set: Average loss: {val_loss:.4f}, Accuracy: {val_accuracy:.4f}%")
         if self.wandb:
-            wandb.log({"Val Loss": val_loss, "Val Accuracy": correct / len(self.val_dataloader.dataset)})
+            wandb.log({"Val Loss": val_loss, "Val Accuracy": val_accuracy})
 
         return val_loss.item()
 
@@ -482,56 +609,53 @@ class TrainNetwork:
         """
         evaluating the neural net's predictions on the test set
         """
-        self.model.eval()
-        test_loss = 0
-        correct = 0
-
-        with torch.no_grad():
-            for X, y in self.test_dataloader:
-                output = self.model(X)
-                test_loss += self.loss(output, torch.unsqueeze(y, 1))
-                pred = torch.round(output)
-                correct += pred.eq(y.view_as(pred)).sum().item()
-
-        test_loss /= len(self.test_dataloader.dataset)
+        test_loss, test_accuracy = self._eval_loop(self.test_dataset, self.test_dataloader)
 
-        print(f"\nTest set: Average loss: {test_loss:.4f}, Accuracy: {correct / len(self.test_dataloader.dataset):.4f}%")
+        print(f"\nTest set: Average loss: {test_loss:.4f}, Accuracy: {test_accuracy:.4f}%")
         if self.wandb:
-            wandb.log({"Test Loss": test_loss, "Test Accuracy": correct / len(self.test_dataloader.dataset)})
+            wandb.log({"Test Loss": test_loss, "Test Accuracy": test_accuracy})
 
         return test_loss.item()
 
     def update_sweep_csv(self, min_loss):  # Top Level
         """
-        updates the sweep csv with the current model's hyperparameters and loss
+        appends the current model's hyperparameters and loss to the sweep csv
         - creates the sweep csv if necessary
+        - the file is locked while appending, so many sweep workers can write to it at once
         """
         sweep_csv_path = ROOT_PATH + f"/Modeling/Sweeps/{self.league}_{self.bet_type}_sweep.csv"
-        if not os.path.exists(sweep_csv_path):
-            cols = ['Date', 'avg_past_games', 'batch_size', 'learning_rate', 'momentum', 'optimizer', 'network_idx', 'epochs', 'loss']
-            df = pd.DataFrame(columns=cols)
-        else:
-            df = pd.read_csv(sweep_csv_path)
-
+        cols = ['Date', 'avg_past_games', 'batch_size', 'learning_rate', 'momentum', 'optimizer', 'network_idx', 'epochs', 'loss']
         today_str = datetime.datetime.today().strftime("%Y-%m-%d")
         new_row = [today_str, self.avg_past_games, self.batch_size, self.learning_rate, self.momentum, self.optimizer_name, self.network_idx, self.epochs, min_loss]
-        df.loc[len(df)] = new_row
-        df.to_csv(sweep_csv_path, index=False)
+
+        with open(sweep_csv_path, 'a') as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                write_header = f.seek(0, os.SEEK_END) == 0
+                pd.DataFrame([new_row], columns=cols).to_csv(f, header=write_header, index=False)
+                f.flush()
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
         print("SAVED SWEEP CSV")
 
     def _clear_others(self, model_path):  # Specific Helper  save_model
         """
         clearing out models with the same setup that performed worse than the new best
+        - another train_best_on_test worker with the same setup may delete a file first, so missing files are skipped
         """
         path_start = model_path.split("loss")[0]
         folder = ROOT_PATH + f"/Models/{self.league}/"
         for path in listdir_fullpath(folder):
             if path.startswith(path_start):
-                os.remove(path)
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
 
     def save_model(self, min_loss, loss):  # Top Level
         """
         saving the model to disk if it's the best one so far
+        - the scaler of the split it was trained on is saved with it
         """
         if loss < min_loss:
             lr_str = str(self.learning_rate).split('.')[1][:5]
@@ -539,8 +663,14 @@ class TrainNetwork:
             model_path = ROOT_PATH + f"/Models/{self.league}/{self.bet_type}_{self.avg_past_games}_apg_network{self.network_idx}_lr_{lr_str}_loss_{loss_str}.pth"
             self._clear_others(model_path)
             torch.save(self.model.state_dict(), model_path)
+            if isinstance(self.train_dataset, SBDataset):
+                self.train_dataset.save_scaler()
 
-    def train(self, val=True, early_stopping=10000, sweep_csv=False, save_model=False):  # Run
+    def train(self, val=True, early_stopping=10000, sweep_csv=False, save_model=False, epoch_callback=None):  # Run
+        """
+        - epoch_callback(epoch, loss) is called after each epoch, training stops if it returns True (used for pruning sweeps)
+        - returns the min val/test loss
+        """
         min_loss = float('inf')
         loss_inc_count = 0
 
@@ -558,9 +688,13 @@ class TrainNetwork:
             if (loss_inc_count > early_stopping):
                 print("Early stopping")
                 break
+            if (epoch_callback is not None) and epoch_callback(i + 1, loss):
+                print("Pruned")
+                break
 
         if sweep_csv:
             self.update_sweep_csv(min_loss)
+        return min_loss
 
 
 class Main:
@@ -610,6 +744,32 @@ class Main:
         sweep_id = "dillonkoch/Sports_Betting/esv5es4l"
         wandb.agent(sweep_id, train_wandb, count=1000)
 
+    def benchmark_train_loops(self, n_samples=50000, batch_size=256, epochs=3):  # Run
+        """
+        timing train_loop samples/sec for every network, with the DataLoader and the fast device batches
+        - uses SyntheticDataset, so no modeling csv is needed
+        """
+        datasets = [SyntheticDataset(n_samples, seed=i) for i in range(3)]
+        results = []
+        for network_idx in range(6):
+            samples_per_sec = {}
+            for fast_train in [False, True]:
+                trainer = TrainNetwork(self.league, self.bet_type, None, batch_size, epochs, 0.001, 0.9, network_idx, 'adam',
+                                       fast_train=fast_train, print_batches=False, datasets=datasets)
+                start = time.time()
+                for _ in range(epochs):
+                    trainer.train_loop()
+                if DEVICE == "cuda":
+                    torch.cuda.synchronize()
+                samples_per_sec[fast_train] = (n_samples * epochs) / (time.time() - start)
+            results.append([f"NeuralNet{network_idx + 1}", round(samples_per_sec[False]), round(samples_per_sec[True]),
+                             round(samples_per_sec[True] / samples_per_sec[False], 1)])
+
+        df = pd.DataFrame(results, columns=['Network', 'DataLoader_Samples_per_sec', 'Fast_Samples_per_sec', 'Speedup'])
+        print(f"{DEVICE}, {n_samples} samples, batch size {batch_size}")
+        print(df.to_string(index=False))
+        return df
+
     def load_best_hyperparameters(self):  # Top Level
         df_path = ROOT_PATH + f"/Modeling/Sweeps/{self.league}_{self.bet_type}_sweep.csv"
         df = pd.read_csv(df_path)
@@ -617,25 +777,34 @@ class Main:
         params = sorted(row_dicts, key=lambda x: x['loss'])[:10]
         return params
 
-    def train_best_on_test(self, wandb=True, n=10):  # Run
+    def _train_param_on_test(self, param, wandb):  # Specific Helper train_best_on_test
+        """
+        training and saving a model with one hyperparameter setting on the test data
+        """
+        apg = param['avg_past_games']
+        batch_size = param['batch_size']
+        learning_rate = param['learning_rate']
+        momentum = param['momentum']
+        optimizer = param['optimizer']
+        network_idx = param['network_idx']
+
+        trainer = TrainNetwork(self.league, self.bet_type, apg, batch_size, 100, learning_rate, momentum, network_idx, optimizer, wandb_single=wandb)
+        return trainer.train(val=False, early_stopping=40, save_model=True)
+
+    def train_best_on_test(self, wandb=True, n=10, workers=1, threads_per_worker=1):  # Run
         """
         loads n best hyperparameter settings from csv, trains them on test data
         - run this after a sweep to get the best models trained and saved
+        - workers > 1 trains the settings in parallel processes, each limited to threads_per_worker torch threads
         """
         params = self.load_best_hyperparameters()
-        for param in params:
-            def run_param(param):
-                apg = param['avg_past_games']
-                batch_size = param['batch_size']
-                learning_rate = param['learning_rate']
-                momentum = param['momentum']
-                optimizer = param['optimizer']
-                network_idx = param['network_idx']
-
-                trainer = TrainNetwork(self.league, self.bet_type, apg, batch_size, 100, learning_rate, momentum, network_idx, optimizer, wandb_single=wandb)
-                trainer.train(val=False, early_stopping=40, save_model=True)
-
-            run_param(param)
+        if workers <= 1:
+            return [self._train_param_on_test(param, wandb) for param in params]
+
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context, initializer=torch.set_num_threads,
+                                 initargs=(threads_per_worker,)) as executor:
+            return list(executor.map(self._train_param_on_test, params, repeat(wandb)))
 
 
 if __name__ == "__main__":
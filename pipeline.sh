@@ -9,8 +9,7 @@ source clean_data.sh
 cd ..
 
 cd Modeling
-python run_models.py
-python alt_odds.py
+python run_all_models.py
 cd ..
 
 cd Agents